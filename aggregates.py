@@ -0,0 +1,224 @@
+"""
+Incrementally maintained per-sensor risk aggregates
+
+RiskAggregates keeps, per sensor, the number of readings at each risk level,
+the first reported location and (derived from the counts) the most common
+risk level. Updating it costs time proportional to the new rows only, and
+aggregates built from separate partitions can be merged.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from risk_engine import RISK_DTYPE, RISK_LEVELS, classify_risk
+
+_NAT = np.datetime64('NaT', 'ns')
+
+
+def mode_from_counts(counts, prefer_higher=True):
+    """Column of the largest count in each row of a (groups x categories) matrix
+
+    Ties go to the highest column (e.g. the more severe risk level) or, with
+    ``prefer_higher=False``, to the lowest.
+    """
+    if prefer_higher:
+        return counts.shape[1] - 1 - np.argmax(counts[:, ::-1], axis=1)
+    return np.argmax(counts, axis=1)
+
+
+class RiskAggregates:
+    """Per-sensor risk counts, first location and modal risk level"""
+
+    def __init__(self):
+        self.sensor_ids = []
+        self._index = {}
+        self.counts = np.zeros((0, len(RISK_LEVELS)), dtype=np.int64)
+        self.first_time = np.empty(0, dtype='datetime64[ns]')
+        self.latitude = np.empty(0, dtype=np.float32)
+        self.longitude = np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def from_frame(cls, df, risk_codes=None):
+        aggregates = cls()
+        aggregates.update(df, risk_codes)
+        return aggregates
+
+    def __len__(self):
+        return len(self.sensor_ids)
+
+    def copy(self):
+        other = RiskAggregates()
+        other.sensor_ids = list(self.sensor_ids)
+        other._index = dict(self._index)
+        other.counts = self.counts.copy()
+        other.first_time = self.first_time.copy()
+        other.latitude = self.latitude.copy()
+        other.longitude = self.longitude.copy()
+        return other
+
+    def _rows_for(self, sensor_ids):
+        """Aggregate rows for sensor ids, adding rows for unseen sensors"""
+        new = [s for s in dict.fromkeys(sensor_ids) if s not in self._index]
+        if new:
+            for sensor_id in new:
+                self._index[sensor_id] = len(self.sensor_ids)
+                self.sensor_ids.append(sensor_id)
+            self.counts = np.vstack([self.counts, np.zeros((len(new), len(RISK_LEVELS)), dtype=np.int64)])
+            self.first_time = np.concatenate([self.first_time, np.full(len(new), _NAT)])
+            self.latitude = np.concatenate([self.latitude, np.full(len(new), np.nan, dtype=np.float32)])
+            self.longitude = np.concatenate([self.longitude, np.full(len(new), np.nan, dtype=np.float32)])
+        return np.array([self._index[s] for s in sensor_ids], dtype=np.int64)
+
+    def update(self, df, risk_codes=None):
+        """Fold new readings into the aggregates
+
+        ``risk_codes`` are RISK_LEVELS indices per row; without them the
+        rows' ``risk_level`` column is used.
+        """
+        if len(df) == 0:
+            return self
+        if risk_codes is None:
+            risk_codes = pd.Categorical(df['risk_level'], dtype=RISK_DTYPE).codes
+        risk_codes = np.asarray(risk_codes, dtype=np.int64)
+
+        # Batch-local sensor codes; categorical columns avoid touching strings per row
+        if isinstance(df['sensor_id'].dtype, pd.CategoricalDtype):
+            local_codes = df['sensor_id'].cat.codes.to_numpy().astype(np.int64)
+            local_ids = df['sensor_id'].cat.categories
+        else:
+            local_codes, local_ids = pd.factorize(df['sensor_id'])
+
+        # Readings without a sensor id are not attributable to any sensor
+        valid = local_codes >= 0
+        n_local, n_levels = len(local_ids), len(RISK_LEVELS)
+        batch_counts = np.bincount(
+            local_codes[valid] * n_levels + risk_codes[valid], minlength=n_local * n_levels
+        ).reshape(n_local, n_levels)
+
+        # Only sensors actually present in the batch get aggregate rows
+        present = np.flatnonzero(batch_counts.sum(axis=1))
+        rows = np.full(n_local, -1, dtype=np.int64)
+        rows[present] = self._rows_for([str(s) for s in local_ids[present]])
+        self.counts[rows[present]] += batch_counts[present]
+
+        # First reading of each sensor in this batch (hash-based, no sort)
+        first = pd.Series(local_codes).drop_duplicates(keep='first')
+        first = first[first.to_numpy() >= 0]
+        positions = first.index.to_numpy()
+        self._update_first(
+            rows[first.to_numpy()],
+            _column(df, 'timestamp', positions, 'datetime64[ns]', _NAT),
+            _column(df, 'latitude', positions, np.float32, np.nan),
+            _column(df, 'longitude', positions, np.float32, np.nan),
+        )
+        return self
+
+    def _update_first(self, rows, first_time, latitude, longitude):
+        """Keep the earliest known location per sensor (existing wins ties)"""
+        current = self.first_time[rows]
+        replace = np.isnat(current) & np.isnan(self.latitude[rows])
+        replace |= ~np.isnat(first_time) & (np.isnat(current) | (first_time < current))
+        rows = rows[replace]
+        self.first_time[rows] = first_time[replace]
+        self.latitude[rows] = latitude[replace]
+        self.longitude[rows] = longitude[replace]
+
+    def merge(self, other):
+        """Fold aggregates built from another partition into these"""
+        if len(other) == 0:
+            return self
+        rows = self._rows_for(other.sensor_ids)
+        self.counts[rows] += other.counts
+        self._update_first(rows, other.first_time, other.latitude, other.longitude)
+        return self
+
+    @classmethod
+    def combine(cls, parts):
+        """Merge aggregates from several partitions"""
+        combined = cls()
+        for part in parts:
+            combined.merge(part)
+        return combined
+
+    def modal_risk(self):
+        """Most common risk level per sensor, ties going to the more severe level"""
+        return mode_from_counts(self.counts)
+
+    def to_analysis(self):
+        """risk_summary, sensor_locations and totals as returned by perform_risk_analysis"""
+        order = np.argsort(np.array(self.sensor_ids, dtype=object), kind='stable')
+        sensor_ids = pd.Index(np.array(self.sensor_ids, dtype=object)[order], name='sensor_id')
+        counts = self.counts[order]
+
+        observed = counts.sum(axis=0) > 0
+        risk_summary = pd.DataFrame(
+            counts[:, observed], index=sensor_ids,
+            columns=pd.CategoricalIndex(np.array(RISK_LEVELS)[observed], dtype=RISK_DTYPE, name='risk_level')
+        )
+        sensor_locations = pd.DataFrame({
+            'sensor_id': sensor_ids.to_numpy(),
+            'latitude': self.latitude[order],
+            'longitude': self.longitude[order],
+            'risk_level': pd.Categorical.from_codes(self.modal_risk()[order], dtype=RISK_DTYPE)
+        })
+        totals = self.counts.sum(axis=0)
+
+        return {
+            'risk_summary': risk_summary,
+            'sensor_locations': sensor_locations,
+            'total_high_risk': int(totals[2]),
+            'total_medium_risk': int(totals[1]),
+            'total_low_risk': int(totals[0])
+        }
+
+
+def _column(df, name, positions, dtype, missing):
+    if name not in df.columns:
+        return np.full(len(positions), missing, dtype=dtype)
+    if dtype == 'datetime64[ns]':
+        return pd.to_datetime(df[name].iloc[positions]).to_numpy(dtype=dtype)
+    return df[name].to_numpy(dtype=dtype, na_value=missing)[positions]
+
+
+def benchmark(history_rows=10_000_000, new_rows=1_000, n_sensors=10_000):
+    """Compare a full rebuild of the aggregates with an incremental update"""
+    from sample_data import SensorNetwork
+
+    network = SensorNetwork(n_sensors=n_sensors, days=history_rows // n_sensors, interval_minutes=24 * 60)
+    history = network.frame()
+    history_risk = np.asarray(classify_risk(history).codes)
+
+    start = time.perf_counter()
+    aggregates = RiskAggregates.from_frame(history, history_risk)
+    print(f"🏗️ build from {len(history):>12,} rows  {time.perf_counter() - start:8.3f}s")
+
+    new = SensorNetwork(n_sensors=n_sensors, days=1, interval_minutes=24 * 60, seed=7).rows(0, new_rows)
+    start = time.perf_counter()
+    aggregates.update(new, np.asarray(classify_risk(new).codes))
+    print(f"➕ update with {len(new):>12,} rows  {time.perf_counter() - start:8.3f}s")
+
+
+def benchmark_mode(sensor_counts=(1_000, 10_000, 50_000), readings_per_sensor=30, lambda_limit=10_000):
+    """Compare the aggregates' modal risk with the per-group value_counts lambda it replaces"""
+    from sample_data import SensorNetwork
+
+    for n_sensors in sensor_counts:
+        df = SensorNetwork(n_sensors=n_sensors, days=readings_per_sensor).frame()
+        df['risk_level'] = classify_risk(df)
+
+        start = time.perf_counter()
+        RiskAggregates.from_frame(df).modal_risk()
+        print(f"⚡ modal_risk  {n_sensors:>8,} sensors  {time.perf_counter() - start:8.3f}s")
+
+        if n_sensors <= lambda_limit:
+            start = time.perf_counter()
+            df.groupby('sensor_id', observed=True)['risk_level'].agg(lambda x: x.value_counts().index[0])
+            print(f"🐢 lambda      {n_sensors:>8,} sensors  {time.perf_counter() - start:8.3f}s")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield incremental aggregate benchmark")
+    benchmark()
+    print("🏔️ GeoShield modal risk benchmark")
+    benchmark_mode()
@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import folium
 from streamlit_folium import st_folium
 import plotly.express as px
 import plotly.graph_objects as go
@@ -13,9 +12,24 @@ import io
 import base64
 from datetime import datetime, timedelta
 from streamlit_option_menu import option_menu
-import json
+import time
 import warnings
 
+from cache import cache_stats, cached, invalidate_all
+from correlation import ROLLING_DRIVERS, ROLLING_TARGET, ROLLING_WINDOWS, rolling_correlation
+from datasets import DATASETS
+from downsample import CHART_WIDTH_PX, downsample, target_points, use_webgl
+from ingest import MEASUREMENT_COLUMNS, bytes_per_row, pyarrow_available, read_sensor_csv
+from orthophoto import get_pyramid, preview_image, request_pyramid
+from pipeline import perform_risk_analysis, prepare_readings
+from risk_engine import DEFAULT_RULES, parse_rules
+from risk_map import build_risk_map, risk_map_data
+from risk_surface import surface_bounds
+from rollups import RESOLUTION_LABELS, RISK_COUNT_COLUMNS, summarize
+from sample_data import SITE_LATITUDE, SITE_LONGITUDE, SensorNetwork
+from streaming import LiveMonitor, broker_messages, mqtt_messages, simulate_feed, socket_json_lines, tail_csv
+from sensor_store import READING_COLUMNS, has_data, read_sensor_data, store_available, write_sensor_data
+
 # Suppress all warnings for a clean user experience
 warnings.filterwarnings('ignore')
 
@@ -85,14 +99,18 @@ st.markdown("""
 # Initialize session state
 if 'uploaded_csv' not in st.session_state:
     st.session_state.uploaded_csv = None
-if 'uploaded_ortho' not in st.session_state:
-    st.session_state.uploaded_ortho = None
-if 'processed_data' not in st.session_state:
-    st.session_state.processed_data = None
-if 'risk_analysis' not in st.session_state:
-    st.session_state.risk_analysis = None
+if 'orthophoto' not in st.session_state:
+    st.session_state.orthophoto = None
+# Processed data lives in the shared DATASETS registry; sessions hold a handle to it
+if 'dataset' not in st.session_state:
+    st.session_state.dataset = None
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'risk_rules' not in st.session_state:
+    st.session_state.risk_rules = DEFAULT_RULES
+if 'live_monitor' not in st.session_state:
+    # Per session: each session starts and stops its own stream
+    st.session_state.live_monitor = LiveMonitor()
 
 def main():
     # Header
@@ -122,14 +140,22 @@ def main():
         # System Status
         st.markdown("### 📡 System Status")
         st.success("🟢 Online")
-        st.metric("Active Sensors", "15")
-        st.metric("Last Update", "2 min ago")
+        active_sensors, last_update = system_status()
+        st.metric("Active Sensors", active_sensors)
+        st.metric("Last Update", last_update)
+        
+        with st.expander("🗄️ Cache Statistics"):
+            st.dataframe(pd.DataFrame(cache_stats()), hide_index=True, use_container_width=True)
+            if len(DATASETS):
+                st.caption("Shared datasets")
+                st.dataframe(pd.DataFrame(DATASETS.stats()), hide_index=True, use_container_width=True)
         
         st.markdown("---")
         
         # Quick Links
         st.markdown("### 🔗 Quick Actions")
         if st.button("🔄 Refresh Data"):
+            invalidate_all()
             st.rerun()
         
         if st.button("📥 Export All"):
@@ -146,17 +172,122 @@ def main():
     elif selected == "🤖 AI Assistant":
         show_ai_assistant()
 
+def format_age(timestamp):
+    """Human readable age of a time.time() timestamp"""
+    seconds = max(0, time.time() - timestamp)
+    if seconds < 10:
+        return "just now"
+    if seconds < 60:
+        return f"{seconds:.0f} s ago"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min ago"
+    return f"{seconds / 3600:.0f} h ago"
+
+def live_risk_analysis():
+    """Incrementally maintained risk analysis of the live stream, if it has data"""
+    monitor = st.session_state.live_monitor
+    if monitor.state is None:
+        return None
+    snapshot = monitor.state.snapshot()
+    return snapshot if snapshot['total_readings'] > 0 else None
+
+def system_status():
+    """Active sensor count and last update age, from the live stream or the loaded data"""
+    live = live_risk_analysis()
+    if live is not None:
+        return live['active_sensors'], format_age(live['last_update'])
+    
+    dataset = session_dataset()
+    if dataset is not None:
+        return len(dataset.sensors), format_age(dataset.processed_at)
+    return "–", "–"
+
+def show_risk_map(sensor_locations, key, height):
+    """Risk zone map shared by the Dashboard and Map Analysis pages"""
+    start = time.perf_counter()
+    view = st.session_state.get(key) or {}
+    zoom = view.get('zoom') or 12
+    data = risk_map_data(sensor_locations)
+    
+    toggle_col1, toggle_col2 = st.columns(2)
+    with toggle_col1:
+        show_surface = st.toggle("🌡️ Show risk surface", key=f"{key}_surface")
+    surface = data.surface(zoom) if show_surface else None
+    
+    orthophoto = get_pyramid(st.session_state.orthophoto) if st.session_state.orthophoto else None
+    with toggle_col2:
+        show_orthophoto = st.toggle(
+            "📷 Show orthophoto overlay", key=f"{key}_orthophoto",
+            disabled=orthophoto is None or not orthophoto.ready,
+            help="Upload an orthophoto on the Data Upload page"
+        )
+    
+    m, sensors = build_risk_map(
+        data, bounds=view.get('bounds'), surface=surface,
+        orthophoto=orthophoto if show_orthophoto and orthophoto.ready else None
+    )
+    returned_objects = []
+    if data.clustered:
+        # Large networks re-send only the visible sensors when the viewport changes
+        returned_objects.append('bounds')
+    if show_surface:
+        # The surface resolution follows the zoom level
+        returned_objects.append('zoom')
+    map_data = st_folium(
+        m, key=key, width=700, height=height,
+        feature_group_to_add=sensors,
+        returned_objects=returned_objects
+    )
+    st.caption(f"{len(sensor_locations):,} sensors · map rendered in {(time.perf_counter() - start) * 1000:.0f} ms")
+    
+    if show_surface and surface is None:
+        error = data.surface_error(zoom)
+        if error:
+            st.error(f"❌ Error computing risk surface: {error}")
+        else:
+            wait_for_surface(data, zoom)
+    return map_data
+
+@st.fragment(run_every=1.0)
+def wait_for_surface(data, zoom):
+    """Poll the background risk surface worker and rerun the app once the surface is ready or failed"""
+    if not data.surface_pending(zoom):
+        st.rerun()
+    st.caption("⏳ Computing risk surface in the background...")
+
+def show_nearby_sensors(spatial_index):
+    """Radius query around a chosen sensor"""
+    with st.expander("📍 Nearby Sensors"):
+        if len(spatial_index) == 0:
+            st.info("No sensor locations available")
+            return
+        
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            sensor_id = st.selectbox("Sensor", sorted(spatial_index.sensor_ids), key='nearby_sensor')
+        with col2:
+            radius = st.number_input("Radius (m)", min_value=10, max_value=50_000, value=500, step=100)
+        
+        nearby = spatial_index.around(sensor_id, radius)
+        if len(nearby) == 0:
+            st.info(f"No other sensors within {radius:,} m of {sensor_id}")
+        else:
+            st.dataframe(nearby.round({'distance_m': 1}), hide_index=True, use_container_width=True)
+
 def show_dashboard():
     st.header("📊 System Dashboard")
     
+    active_sensors, last_update = system_status()
+    live = live_risk_analysis()
+    
     # Display current system metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.metric(
             label="📡 Active Sensors",
-            value="15",
-            delta="2 new"
+            value=active_sensors,
+            delta=f"streaming: {st.session_state.live_monitor.source_name}" if live is not None else None
         )
     
     with col2:
@@ -187,16 +318,19 @@ def show_dashboard():
     
     with col1:
         st.subheader("📈 Risk Trend (Last 7 Days)")
-        dates = pd.date_range(end=datetime.now(), periods=7)
-        risk_data = pd.DataFrame({
-            'Date': dates,
-            'High Risk': np.random.randint(1, 5, 7),
-            'Medium Risk': np.random.randint(3, 8, 7),
-            'Low Risk': np.random.randint(8, 15, 7)
-        })
+        if ensure_monitoring_data():
+            # Readings per risk level and day, from the daily rollups
+            dataset = session_dataset()
+            end = dataset.end
+            trend = dataset.rollups.risk_trend('day', start=end.normalize() - pd.Timedelta(days=6), end=end)
+            risk_data = trend.rename(columns={
+                'timestamp': 'Date', 'high_risk': 'High Risk', 'medium_risk': 'Medium Risk', 'low_risk': 'Low Risk'
+            })[['Date', 'High Risk', 'Medium Risk', 'Low Risk']]
+        else:
+            risk_data = pd.DataFrame(columns=['Date', 'High Risk', 'Medium Risk', 'Low Risk'])
         
-        melted_data = risk_data.melt(id_vars='Date', var_name='Risk Level', value_name='Count')
-        fig = px.line(melted_data, x='Date', y='Count', color='Risk Level',
+        melted_data = risk_data.melt(id_vars='Date', var_name='Risk Level', value_name='Readings')
+        fig = px.line(melted_data, x='Date', y='Readings', color='Risk Level',
                      color_discrete_sequence=['#dc3545', '#fd7e14', '#28a745'])
         fig.update_layout(height=300, showlegend=True)
         st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
@@ -218,73 +352,29 @@ def show_dashboard():
     st.markdown("---")
     st.subheader("🗺️ Live Risk Zone Map")
     
-    # Load current monitoring data for map
-    if st.session_state.processed_data is None:
-        current_data = generate_sensor_data()
-        process_sensor_data(current_data)
-    
-    if st.session_state.processed_data is not None:
-        df = st.session_state.processed_data
-        risk_analysis = st.session_state.risk_analysis
+    # Load current monitoring data for map (the live stream takes precedence)
+    if live is not None or ensure_monitoring_data():
+        risk_analysis = live if live is not None else session_dataset().analysis
         
         map_col1, map_col2 = st.columns([3, 1])
         
         with map_col1:
-            # Create map
-            center_lat = df['latitude'].mean()
-            center_lon = df['longitude'].mean()
-            
-            m = folium.Map(
-                location=[center_lat, center_lon],
-                zoom_start=12,
-                tiles='OpenStreetMap'
-            )
-            
-            # Add risk zones
-            risk_colors = {'High': 'red', 'Medium': 'orange', 'Low': 'green'}
-            
-            for _, row in risk_analysis['sensor_locations'].iterrows():
-                color = risk_colors[row['risk_level']]
-                folium.CircleMarker(
-                    location=[row['latitude'], row['longitude']],
-                    radius=10,
-                    popup=f"Sensor: {row['sensor_id']}<br>Risk: {row['risk_level']}",
-                    color=color,
-                    fill=True,
-                    fillColor=color,
-                    fillOpacity=0.7
-                ).add_to(m)
-            
-            # Add legend with better styling
-            legend_html = '''
-            <div style="position: fixed; 
-                        bottom: 50px; left: 50px; width: 160px; height: 110px; 
-                        background-color: rgba(255, 255, 255, 0.95); 
-                        border: 2px solid #333; 
-                        border-radius: 8px;
-                        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-                        z-index: 9999; 
-                        font-size: 13px; 
-                        padding: 12px;
-                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;">
-            <p style="margin: 0 0 8px 0; font-weight: bold; color: #333; border-bottom: 1px solid #ddd; padding-bottom: 4px;">Risk Levels</p>
-            <p style="margin: 4px 0; color: #333;"><span style="display: inline-block; width: 12px; height: 12px; background-color: red; border-radius: 50%; margin-right: 8px;"></span>High Risk</p>
-            <p style="margin: 4px 0; color: #333;"><span style="display: inline-block; width: 12px; height: 12px; background-color: orange; border-radius: 50%; margin-right: 8px;"></span>Medium Risk</p>
-            <p style="margin: 4px 0; color: #333;"><span style="display: inline-block; width: 12px; height: 12px; background-color: green; border-radius: 50%; margin-right: 8px;"></span>Low Risk</p>
-            </div>
-            '''
-            m.get_root().html.add_child(folium.Element(legend_html))
-            
-            map_data = st_folium(m, width=700, height=400)
+            map_data = show_risk_map(risk_analysis['sensor_locations'], 'dashboard_map', height=400)
         
         with map_col2:
             st.markdown("**📊 Risk Summary**")
             
-            risk_counts = df['risk_level'].value_counts()
+            # Totals come from the aggregates, not a scan of the readings
+            risk_counts = {
+                'High': risk_analysis['total_high_risk'],
+                'Medium': risk_analysis['total_medium_risk'],
+                'Low': risk_analysis['total_low_risk']
+            }
+            total_readings = sum(risk_counts.values())
             
             for risk_level in ['High', 'Medium', 'Low']:
                 count = risk_counts.get(risk_level, 0)
-                percentage = (count / len(df)) * 100 if len(df) > 0 else 0
+                percentage = (count / total_readings) * 100 if total_readings > 0 else 0
                 
                 risk_class = f"risk-{risk_level.lower()}"
                 st.markdown(f"""
@@ -302,6 +392,8 @@ def show_dashboard():
             
             if st.button("📊 Full Analysis", use_container_width=True):
                 st.info("Navigate to Map Analysis page for detailed view")
+        
+        show_nearby_sensors(risk_analysis['spatial_index'])
     
     st.markdown("---")
     
@@ -429,11 +521,11 @@ def show_dashboard():
         """, unsafe_allow_html=True)
     
     with status_col3:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <h4>🔄 Last Update</h4>
-            <h2>2 min</h2>
-            <p>Data refresh ago</p>
+            <h2>{last_update}</h2>
+            <p>Data refresh</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -503,9 +595,21 @@ def show_data_upload():
         )
         
         if uploaded_ortho:
-            st.session_state.uploaded_ortho = uploaded_ortho
-            st.success("✅ Orthophoto processed successfully!")
-            st.image(uploaded_ortho, caption="Current Site Orthophoto", use_column_width=True)
+            # Hash and queue each upload once; identical images reuse their tile pyramid.
+            # Only the content hash is kept in the session, never the image itself
+            if uploaded_ortho.file_id != st.session_state.get('uploaded_ortho_id'):
+                with st.spinner("Hashing orthophoto..."):
+                    pyramid = request_pyramid(uploaded_ortho, bounds=orthophoto_fallback_bounds())
+                st.session_state.orthophoto = pyramid.key
+                st.session_state.uploaded_ortho_id = uploaded_ortho.file_id
+            
+            show_orthophoto_status(st.session_state.orthophoto)
+            try:
+                preview = preview_image(st.session_state.orthophoto, uploaded_ortho)
+            except Exception as e:
+                st.error(f"❌ Unable to preview orthophoto: {str(e)}")
+            else:
+                st.image(preview, caption="Current Site Orthophoto (preview)", use_column_width=True)
     
     with col2:
         st.subheader("📊 Sensor Data Upload")
@@ -517,13 +621,65 @@ def show_data_upload():
         
         if uploaded_csv:
             st.session_state.uploaded_csv = uploaded_csv
-            # Always use our sensor network data
-            df = generate_sensor_data()
-            st.success("✅ Sensor data processed successfully!")
-            st.dataframe(df.head(), use_container_width=True)
             
-            # Process the data
-            process_sensor_data(df)
+            # Parse each upload once, not on every rerun
+            if uploaded_csv.file_id != st.session_state.get('uploaded_csv_id'):
+                progress_bar = st.progress(0.0, text="Reading sensor data...")
+                
+                def report_progress(fraction, rows_read):
+                    progress_bar.progress(fraction, text=f"Reading sensor data... {rows_read:,} rows")
+                
+                try:
+                    df = read_sensor_csv(
+                        uploaded_csv,
+                        engine='pyarrow' if pyarrow_available() else None,
+                        progress=report_progress
+                    )
+                except Exception as e:
+                    progress_bar.empty()
+                    st.error(f"❌ Error reading sensor data: {str(e)}")
+                else:
+                    progress_bar.empty()
+                    st.success("✅ Sensor data processed successfully!")
+                    st.dataframe(df.head(), use_container_width=True)
+                    
+                    # Process the data
+                    if process_sensor_data(df):
+                        st.session_state.uploaded_csv_id = uploaded_csv.file_id
+            elif session_dataset() is not None:
+                st.success("✅ Sensor data processed successfully!")
+                st.dataframe(session_dataset().readings.head(), use_container_width=True)
+    
+    # Live streaming ingestion
+    with st.expander("📡 Live Streaming"):
+        show_streaming_controls()
+    
+    # Site and sensor specific risk thresholds
+    with st.expander("⚙️ Risk Rules"):
+        uploaded_rules = st.file_uploader(
+            "Upload risk rules (JSON or YAML)",
+            type=['json', 'yaml', 'yml'],
+            help="Per-level conditions with optional per-site and per-sensor overrides"
+        )
+        
+        # Only apply a rules file once, so restoring defaults sticks
+        if uploaded_rules and uploaded_rules.file_id != st.session_state.get('risk_rules_file'):
+            try:
+                rules = parse_rules(
+                    uploaded_rules.getvalue().decode('utf-8'),
+                    yaml_format=uploaded_rules.name.lower().endswith(('.yaml', '.yml'))
+                )
+            except Exception as e:
+                st.error(f"❌ Invalid risk rules: {str(e)}")
+            else:
+                st.session_state.risk_rules_file = uploaded_rules.file_id
+                apply_risk_rules(rules)
+                st.success("✅ Risk rules applied!")
+        
+        if st.session_state.risk_rules != DEFAULT_RULES and st.button("↩️ Restore Default Rules"):
+            apply_risk_rules(DEFAULT_RULES)
+        
+        st.json(st.session_state.risk_rules, expanded=False)
     
     # Show current monitoring data format
     if not uploaded_csv:
@@ -541,68 +697,112 @@ def show_data_upload():
             mime="text/csv"
         )
 
+def orthophoto_fallback_bounds():
+    """Bounds for orthophotos without georeferencing: the sensor network's extent"""
+    dataset = session_dataset()
+    if dataset is not None and len(dataset.analysis['sensor_locations']) > 0:
+        locations = dataset.analysis['sensor_locations'].dropna(subset=['latitude', 'longitude'])
+        if len(locations) > 0:
+            return surface_bounds(locations['latitude'].to_numpy(), locations['longitude'].to_numpy())
+    return (SITE_LATITUDE - 0.01, SITE_LONGITUDE - 0.01, SITE_LATITUDE + 0.01, SITE_LONGITUDE + 0.01)
+
+def show_orthophoto_status(key):
+    """Tile pyramid build state of the uploaded orthophoto"""
+    pyramid = get_pyramid(key)
+    if pyramid.error:
+        st.error(f"❌ Error building orthophoto tiles: {pyramid.error}")
+    elif pyramid.ready:
+        metadata = pyramid.metadata
+        st.success(f"✅ Orthophoto tiled for zoom {metadata['min_zoom']}-{metadata['max_zoom']}")
+        if not metadata['georeferenced']:
+            st.caption("Image is not georeferenced; it is placed over the sensor network's extent")
+    else:
+        wait_for_orthophoto(key)
+
+@st.fragment(run_every=1.0)
+def wait_for_orthophoto(key):
+    """Show tiling progress and rerun the app once the pyramid is built"""
+    pyramid = get_pyramid(key)
+    if pyramid.ready or pyramid.error:
+        st.rerun()
+    st.progress(pyramid.progress, text="🧱 Building orthophoto tiles...")
+
+def show_streaming_controls():
+    """Start/stop the session's live stream and show its state"""
+    monitor = st.session_state.live_monitor
+    source = st.selectbox(
+        "Source",
+        ["Simulated sensor feed", "Tail CSV file", "TCP socket (JSON lines)", "MQTT broker"]
+    )
+    
+    if source == "Tail CSV file":
+        path = st.text_input("CSV file path", value="live_sensor_data.csv")
+        make_source = lambda stop_event: tail_csv(path, stop_event)
+    elif source == "TCP socket (JSON lines)":
+        host = st.text_input("Host", value="localhost")
+        port = st.number_input("Port", value=9000, step=1)
+        make_source = lambda stop_event: socket_json_lines(host, int(port), stop_event)
+    elif source == "MQTT broker":
+        host = st.text_input("Broker host", value="localhost")
+        port = st.number_input("Broker port", value=1883, step=1)
+        topic = st.text_input("Topic", value="geoshield/readings")
+        make_source = lambda stop_event: mqtt_messages(host, int(port), topic, stop_event)
+    else:
+        network = SensorNetwork(n_sensors=15, days=1, interval_minutes=1, high_risk_fraction=0.2)
+        broker = monitor.broker
+        make_source = lambda stop_event: broker_messages(broker, 'geoshield/simulated', stop_event)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("▶️ Start Stream", disabled=monitor.running):
+            feeders = []
+            if source == "Simulated sensor feed":
+                feeders = [lambda stop_event: simulate_feed(broker, 'geoshield/simulated', network, stop_event)]
+            monitor.start(make_source, source, rules=st.session_state.risk_rules, feeders=feeders)
+    with col2:
+        if st.button("⏹️ Stop Stream", disabled=not monitor.running):
+            monitor.stop()
+    
+    if monitor.error:
+        st.error(f"❌ Stream stopped: {monitor.error}")
+    
+    live = live_risk_analysis()
+    if monitor.running:
+        st.success(f"🟢 Streaming from {monitor.source_name}")
+    if live is not None:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Live Readings", f"{live['total_readings']:,}")
+        with col2:
+            st.metric("Active Sensors", live['active_sensors'])
+        with col3:
+            st.metric("Last Update", format_age(live['last_update']))
+
+@cached('sensor_data', maxsize=1, ttl=300, copy=True)
 def generate_sensor_data():
     """Generate current sensor data from monitoring network"""
-    np.random.seed(42)
-    n_sensors = 15
-    n_days = 30
-    
-    data = []
-    for sensor_id in range(1, n_sensors + 1):
-        for day in range(n_days):
-            timestamp = datetime.now() - timedelta(days=day)
-            
-            # Generate realistic sensor data with some correlation
-            base_displacement = np.random.normal(5, 2)
-            base_rainfall = max(0, np.random.normal(20, 15))
-            
-            # Create some correlation between displacement and rainfall
-            displacement = max(0, base_displacement + base_rainfall * 0.1 + np.random.normal(0, 1))
-            
-            data.append({
-                'sensor_id': f'S{sensor_id:03d}',
-                'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'displacement_mm': round(displacement, 2),
-                'pore_pressure_kpa': round(np.random.normal(150, 30), 2),
-                'strain_micro': round(np.random.normal(100, 25), 2),
-                'vibration_ms2': round(np.random.exponential(2), 3),
-                'rainfall_mm': round(base_rainfall, 1),
-                'latitude': round(24.1711917 + np.random.normal(0, 0.01), 6),
-                'longitude': round(82.6588845 + np.random.normal(0, 0.01), 6)
-            })
-    
-    return pd.DataFrame(data)
+    network = SensorNetwork(n_sensors=15, days=30, high_risk_fraction=0, seed=42, spread_deg=0.01)
+    return network.frame()
 
-def process_sensor_data(df):
+def process_sensor_data(df, persist=True):
     """Process uploaded sensor data and perform risk analysis"""
     try:
-        # Validate required columns
-        required_columns = ['sensor_id', 'timestamp', 'displacement_mm', 'rainfall_mm']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            st.error(f"❌ Missing required columns: {', '.join(missing_columns)}")
-            return
-        
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Add coordinates if not present
-        if 'latitude' not in df.columns or 'longitude' not in df.columns:
-            df['latitude'] = 40.7128 + np.random.normal(0, 0.01, len(df))
-            df['longitude'] = -74.0060 + np.random.normal(0, 0.01, len(df))
+        # Validate, sort by sensor and time, add rolling features (velocity, cumulative rainfall, ...)
+        try:
+            df = prepare_readings(df)
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+            return False
         
         # Perform risk analysis
-        risk_analysis = perform_risk_analysis(df)
-        
-        st.session_state.processed_data = df
-        st.session_state.risk_analysis = risk_analysis
+        df, risk_analysis = perform_risk_analysis(df, st.session_state.risk_rules)
+        open_dataset(df, risk_analysis, persist)
         
         st.success("✅ Data processed and risk analysis completed!")
         
         # Show summary
         st.subheader("📊 Processing Summary")
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             st.metric("Total Records", len(df))
@@ -610,116 +810,108 @@ def process_sensor_data(df):
             st.metric("Unique Sensors", df['sensor_id'].nunique())
         with col3:
             st.metric("Date Range", f"{df['timestamp'].min().date()} to {df['timestamp'].max().date()}")
+        with col4:
+            st.metric("Memory per Reading", f"{bytes_per_row(df):.0f} B")
+        
+        return True
         
     except Exception as e:
         st.error(f"❌ Error processing data: {str(e)}")
+    return False
 
-def perform_risk_analysis(df):
-    """Perform risk analysis based on established geotechnical rules"""
-    
-    # Define risk rules
-    def calculate_risk(row):
-        displacement = row['displacement_mm']
-        rainfall = row['rainfall_mm']
-        
-        # Risk assessment logic
-        if displacement > 10 and rainfall > 50:
-            return 'High'
-        elif displacement > 7 or rainfall > 30:
-            return 'Medium'
-        else:
-            return 'Low'
-    
-    # Apply risk calculation
-    df['risk_level'] = df.apply(calculate_risk, axis=1)
-    
-    # Calculate additional metrics
-    risk_summary = df.groupby(['sensor_id', 'risk_level']).size().unstack(fill_value=0)
-    sensor_locations = df.groupby('sensor_id').agg({
-        'latitude': 'first',
-        'longitude': 'first',
-        'risk_level': lambda x: x.value_counts().index[0]  # Most common risk level
-    }).reset_index()
-    
-    return {
-        'processed_data': df,
-        'risk_summary': risk_summary,
-        'sensor_locations': sensor_locations,
-        'total_high_risk': len(df[df['risk_level'] == 'High']),
-        'total_medium_risk': len(df[df['risk_level'] == 'Medium']),
-        'total_low_risk': len(df[df['risk_level'] == 'Low'])
-    }
+def open_dataset(df, risk_analysis, persist=True):
+    """Point the session at the shared dataset of processed readings, persisting them as a new upload"""
+    # Sessions that loaded the same data share one read-only copy
+    previous = st.session_state.dataset
+    st.session_state.dataset = DATASETS.open(df, risk_analysis)
+    if previous is not None:
+        previous.release()
+    
+    # The store only serves cold starts; pages read the in-memory dataset
+    if persist and store_available():
+        try:
+            write_sensor_data(df, upload_id=st.session_state.dataset.version)
+        except Exception as e:
+            st.warning(f"⚠️ Sensor store unavailable, keeping data in memory only: {str(e)}")
+
+def session_dataset():
+    """The shared dataset this session is looking at, or None"""
+    handle = st.session_state.dataset
+    return handle.dataset if handle is not None else None
+
+def ensure_monitoring_data():
+    """Load monitoring data into the session if none is loaded yet"""
+    if session_dataset() is None:
+        # Cold start: read the raw columns of the last 30 days of the latest upload from
+        # the columnar store; features and risk levels are recomputed from them
+        if store_available() and has_data():
+            try:
+                stored = read_sensor_data(READING_COLUMNS, start=datetime.now() - timedelta(days=30))
+            except Exception:
+                stored = None
+            if stored is not None and len(stored) > 0:
+                process_sensor_data(stored, persist=False)
+        
+        if session_dataset() is None:
+            current_data = generate_sensor_data()
+            process_sensor_data(current_data)
+    
+    return session_dataset() is not None
+
+def load_sensor_data(columns=None, sensors=None, start=None, end=None):
+    """The session's processed readings, sliced by sensor and time from the shared dataset"""
+    dataset = session_dataset()
+    start = start if start is not None else dataset.start
+    end = end if end is not None else dataset.end
+    sensors = sensors if sensors is not None else dataset.sensors
+    return dataset.table.query(sensors, start, end, columns)
+
+@cached('rolling_correlation', maxsize=32, ttl=3600, key=lambda version, sensor_id, window: (version, sensor_id, window))
+def compute_rolling_correlation(version, sensor_id, window):
+    """Rolling displacement correlations of one sensor in a data version"""
+    return rolling_correlation(DATASETS.get(version).table.sensor(sensor_id), window=window)
+
+def session_rolling_correlation(sensor_id, window):
+    return compute_rolling_correlation(st.session_state.dataset.version, str(sensor_id), window)
+
+def apply_risk_rules(rules):
+    """Switch risk rules and re-classify the loaded data in one vectorized pass"""
+    st.session_state.risk_rules = rules
+    dataset = session_dataset()
+    if dataset is not None:
+        # Risk levels are re-derived on every load, so the stored upload stays as it is
+        open_dataset(*perform_risk_analysis(dataset.readings, rules), persist=False)
 
 def show_map_analysis():
     st.header("🗺️ Interactive Map Analysis")
     
-    if st.session_state.processed_data is None:
-        # Load current monitoring data
-        current_data = generate_sensor_data()
-        process_sensor_data(current_data)
-        
-        if st.session_state.processed_data is None:
-            st.error("❌ Unable to load monitoring data. Please try refreshing.")
-            return
+    if not ensure_monitoring_data():
+        st.error("❌ Unable to load monitoring data. Please try refreshing.")
+        return
     
     # Create map with real data
-    df = st.session_state.processed_data
-    risk_analysis = st.session_state.risk_analysis
+    risk_analysis = session_dataset().analysis
     
     col1, col2 = st.columns([3, 1])
     
     with col1:
         st.subheader("🗺️ Risk Zone Visualization")
         
-        # Create map
-        center_lat = df['latitude'].mean()
-        center_lon = df['longitude'].mean()
-        
-        m = folium.Map(
-            location=[center_lat, center_lon],
-            zoom_start=12,
-            tiles='OpenStreetMap'
-        )
-        
-        # Add risk zones
-        risk_colors = {'High': 'red', 'Medium': 'orange', 'Low': 'green'}
-        
-        for _, row in risk_analysis['sensor_locations'].iterrows():
-            color = risk_colors[row['risk_level']]
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=10,
-                popup=f"Sensor: {row['sensor_id']}<br>Risk: {row['risk_level']}",
-                color=color,
-                fill=True,
-                fillColor=color,
-                fillOpacity=0.7
-            ).add_to(m)
-        
-        # Add legend
-        legend_html = '''
-        <div style="position: fixed; 
-                    bottom: 50px; left: 50px; width: 150px; height: 90px; 
-                    background-color: white; border:2px solid grey; z-index:9999; 
-                    font-size:14px; padding: 10px">
-        <p><b>Risk Levels</b></p>
-        <p><i class="fa fa-circle" style="color:red"></i> High Risk</p>
-        <p><i class="fa fa-circle" style="color:orange"></i> Medium Risk</p>
-        <p><i class="fa fa-circle" style="color:green"></i> Low Risk</p>
-        </div>
-        '''
-        m.get_root().html.add_child(folium.Element(legend_html))
-        
-        map_data = st_folium(m, width=700, height=500)
+        map_data = show_risk_map(risk_analysis['sensor_locations'], 'analysis_map', height=500)
     
     with col2:
         st.subheader("📊 Risk Summary")
         
-        risk_counts = df['risk_level'].value_counts()
+        risk_counts = {
+            'High': risk_analysis['total_high_risk'],
+            'Medium': risk_analysis['total_medium_risk'],
+            'Low': risk_analysis['total_low_risk']
+        }
+        total_readings = sum(risk_counts.values())
         
         for risk_level in ['High', 'Medium', 'Low']:
-            count = risk_counts.get(risk_level, 0)
-            percentage = (count / len(df)) * 100 if len(df) > 0 else 0
+            count = risk_counts[risk_level]
+            percentage = (count / total_readings) * 100 if total_readings > 0 else 0
             
             risk_class = f"risk-{risk_level.lower()}"
             st.markdown(f"""
@@ -734,7 +926,6 @@ def show_map_analysis():
         # Map controls
         st.subheader("🎛️ Map Controls")
         
-        show_orthophoto = st.checkbox("Show Orthophoto Overlay", value=False)
         show_contours = st.checkbox("Show Elevation Contours", value=False)
         show_sensors = st.checkbox("Show Sensor Networks", value=True)
 
@@ -742,23 +933,61 @@ def show_map_analysis():
 def show_analytics():
     st.header("📈 Analytics Dashboard")
     
-    if st.session_state.processed_data is None:
-        # Load current monitoring data
-        current_data = generate_sensor_data()
-        process_sensor_data(current_data)
-        
-        if st.session_state.processed_data is None:
-            st.error("❌ Unable to load monitoring data. Please try refreshing.")
-            return
+    if not ensure_monitoring_data():
+        st.error("❌ Unable to load monitoring data. Please try refreshing.")
+        return
     
-    df = st.session_state.processed_data
+    dataset = session_dataset()
+    risk_analysis = dataset.analysis
+    rollups = dataset.rollups
     
     # Time series analysis
     st.subheader("📊 Sensor Data Trends")
     
-    # Select sensor for detailed analysis
-    selected_sensor = st.selectbox("Select Sensor for Analysis", df['sensor_id'].unique())
-    sensor_data = df[df['sensor_id'] == selected_sensor].sort_values('timestamp')
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        # Select sensor for detailed analysis (reads only that sensor's partitions)
+        selected_sensor = st.selectbox("Select Sensor for Analysis", risk_analysis['sensor_locations']['sensor_id'])
+    with col2:
+        first_day, last_day = dataset.start.date(), dataset.end.date()
+        date_range = st.date_input("Time Range", value=(first_day, last_day), min_value=first_day, max_value=last_day)
+    with col3:
+        resolution = st.selectbox(
+            "Resolution", ['auto', *RESOLUTION_LABELS],
+            format_func=lambda value: 'Auto' if value == 'auto' else RESOLUTION_LABELS[value]
+        )
+    
+    start = pd.Timestamp(date_range[0])
+    end = pd.Timestamp(date_range[-1]) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    if resolution == 'auto':
+        resolution = rollups.choose_resolution([selected_sensor], start, end)
+    
+    if resolution == 'raw':
+        sensor_data = load_sensor_data(sensors=[selected_sensor], start=start, end=end)
+        risk_counts = sensor_data['risk_level'].value_counts()
+    else:
+        # Pre-aggregated buckets: mean with min/max band, rainfall totals
+        buckets = rollups.query(resolution, [selected_sensor], start, end)
+        sensor_data = buckets[['timestamp']].assign(**{
+            col: buckets[f'{col}_mean'] for col in MEASUREMENT_COLUMNS if f'{col}_mean' in buckets.columns
+        })
+        sensor_data['rainfall_mm'] = buckets['rainfall_mm_sum']
+        sensor_data['displacement_mm_min'] = buckets['displacement_mm_min']
+        sensor_data['displacement_mm_max'] = buckets['displacement_mm_max']
+        risk_counts = pd.Series(
+            buckets[RISK_COUNT_COLUMNS].sum().to_numpy(), index=['Low', 'Medium', 'High']
+        )
+        risk_counts = risk_counts[risk_counts > 0]
+    
+    # Each trend chart is half the page wide: plot at most its point budget
+    n_points = target_points(CHART_WIDTH_PX // 2)
+    displacement = downsample(sensor_data, 'timestamp', 'displacement_mm', n_points, method='lttb')
+    rainfall = downsample(sensor_data, 'timestamp', 'rainfall_mm', n_points, method='minmax')
+    scatter = go.Scattergl if use_webgl(len(displacement)) else go.Scatter
+    st.caption(
+        f"📉 {RESOLUTION_LABELS[resolution]}: {len(sensor_data):,} points "
+        f"({max(len(displacement), len(rainfall)):,} plotted)"
+    )
     
     # Create multi-subplot chart
     fig = make_subplots(
@@ -767,21 +996,31 @@ def show_analytics():
     )
     
     # Displacement trend
+    if resolution != 'raw':
+        fig.add_trace(
+            scatter(x=displacement['timestamp'], y=displacement['displacement_mm_max'], mode='lines',
+                    line_width=0, name='Displacement max', hoverinfo='skip'),
+            row=1, col=1
+        )
+        fig.add_trace(
+            scatter(x=displacement['timestamp'], y=displacement['displacement_mm_min'], mode='lines', line_width=0,
+                    fill='tonexty', fillcolor='rgba(0, 0, 255, 0.15)', name='Displacement min', hoverinfo='skip'),
+            row=1, col=1
+        )
     fig.add_trace(
-        go.Scatter(x=sensor_data['timestamp'], y=sensor_data['displacement_mm'],
-                  mode='lines+markers', name='Displacement', line_color='blue'),
+        scatter(x=displacement['timestamp'], y=displacement['displacement_mm'],
+                mode='lines+markers' if len(displacement) <= 200 else 'lines', name='Displacement', line_color='blue'),
         row=1, col=1
     )
     
     # Rainfall pattern
     fig.add_trace(
-        go.Bar(x=sensor_data['timestamp'], y=sensor_data['rainfall_mm'],
+        go.Bar(x=rainfall['timestamp'], y=rainfall['rainfall_mm'],
                name='Rainfall', marker_color='lightblue'),
         row=1, col=2
     )
     
     # Risk distribution
-    risk_counts = sensor_data['risk_level'].value_counts()
     fig.add_trace(
         go.Bar(x=risk_counts.index, y=risk_counts.values,
                name='Risk Distribution', 
@@ -789,12 +1028,10 @@ def show_analytics():
         row=2, col=1
     )
     
-    # Correlation heatmap data
-    numeric_cols = ['displacement_mm', 'rainfall_mm', 'pore_pressure_kpa', 'strain_micro', 'vibration_ms2']
-    available_cols = [col for col in numeric_cols if col in sensor_data.columns]
-    
-    if len(available_cols) > 1:
-        corr_matrix = sensor_data[available_cols].corr()
+    # Correlation heatmap data (the sensor's full history, from the cached statistics)
+    correlations = session_dataset().correlations
+    if len(correlations.columns) > 1:
+        corr_matrix = correlations.matrix(selected_sensor)
         fig.add_trace(
             go.Heatmap(z=corr_matrix.values, x=corr_matrix.columns, y=corr_matrix.columns,
                       colorscale='RdBu', zmid=0, name='Correlation'),
@@ -810,11 +1047,51 @@ def show_analytics():
     
     with col1:
         st.write("**Displacement Statistics**")
-        st.write(sensor_data['displacement_mm'].describe())
+        if resolution == 'raw':
+            st.write(sensor_data['displacement_mm'].describe())
+        else:
+            st.write(summarize(buckets, 'displacement_mm'))
     
     with col2:
         st.write("**Rainfall Statistics**")
-        st.write(sensor_data['rainfall_mm'].describe())
+        if resolution == 'raw':
+            st.write(sensor_data['rainfall_mm'].describe())
+        else:
+            st.write(summarize(buckets, 'rainfall_mm'))
+    
+    show_correlations(correlations, selected_sensor)
+
+def show_correlations(correlations, selected_sensor):
+    """Fleet-wide and cross-sensor correlations plus the sensor's rolling correlation"""
+    st.subheader("🔗 Correlations")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("**Fleet-wide Correlation Matrix**")
+        corr_matrix = correlations.matrix()
+        fig = go.Figure(go.Heatmap(z=corr_matrix.values, x=corr_matrix.columns, y=corr_matrix.columns,
+                                   colorscale='RdBu', zmid=0, zmin=-1, zmax=1))
+        fig.update_layout(height=400, margin=dict(t=10))
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    
+    with col2:
+        driver = st.selectbox("Displacement correlated with", ROLLING_DRIVERS)
+        by_sensor = correlations.pair(ROLLING_TARGET, driver)
+        fig = go.Figure(go.Bar(x=by_sensor.index, y=by_sensor.values, marker_color='steelblue'))
+        fig.update_layout(height=330, margin=dict(t=10), yaxis_range=[-1, 1], yaxis_title='Correlation')
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    
+    window = st.selectbox("Rolling Window", list(ROLLING_WINDOWS), index=1)
+    rolling = session_rolling_correlation(selected_sensor, ROLLING_WINDOWS[window])
+    fig = go.Figure()
+    for driver in ROLLING_DRIVERS:
+        if driver in rolling.columns:
+            points = downsample(rolling, 'timestamp', driver, target_points(), method='lttb')
+            scatter = go.Scattergl if use_webgl(len(points)) else go.Scatter
+            fig.add_trace(scatter(x=points['timestamp'], y=points[driver], mode='lines', name=f'vs {driver}'))
+    fig.update_layout(height=300, yaxis_range=[-1, 1], title_text=f"Rolling {window} displacement correlation: {selected_sensor}")
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
 def show_current_analytics():
     """Show current analytics data"""
@@ -953,6 +1230,12 @@ def show_risk_report():
 def generate_html_report(report_type, include_charts, include_raw_data, include_recommendations):
     """Generate HTML report for download"""
     
+    raw_data_html = ""
+    if include_raw_data and ensure_monitoring_data():
+        # Latest reading of every sensor, straight from the per-sensor index
+        latest = session_dataset().table.latest()
+        raw_data_html = f"<div class='section'><h2>Latest Sensor Readings</h2>{latest.to_html(index=False)}</div>"
+    
     html_content = f"""
     <!DOCTYPE html>
     <html>
@@ -992,6 +1275,8 @@ def generate_html_report(report_type, include_charts, include_raw_data, include_
             <div class="risk-low">LOW RISK: Remaining zones - Continue routine monitoring</div>
         </div>
         
+        {raw_data_html}
+        
         {"<div class='section'><h2>Recommendations</h2><ul><li>Implement enhanced monitoring protocols</li><li>Consider evacuation procedures for high-risk zones</li><li>Install additional sensors</li></ul></div>" if include_recommendations else ""}
     </body>
     </html>
@@ -1010,10 +1295,8 @@ def generate_shapefile():
     """Generate CSV file for GIS (simplified version without geospatial dependencies)"""
     try:
         # Use current monitoring data
-        if st.session_state.processed_data is not None:
-            current_data = st.session_state.processed_data
-        else:
-            current_data = generate_sensor_data()
+        ensure_monitoring_data()
+        current_data = load_sensor_data()
         
         # Create CSV buffer for download
         csv_buffer = io.StringIO()
@@ -1026,6 +1309,17 @@ def generate_shapefile():
             mime="text/csv"
         )
         
+        if store_available():
+            parquet_buffer = io.BytesIO()
+            current_data.to_parquet(parquet_buffer, index=False)
+            
+            st.download_button(
+                label="📥 Download GIS Data (Parquet)",
+                data=parquet_buffer.getvalue(),
+                file_name=f"geoshield_risk_zones_{datetime.now().strftime('%Y%m%d')}.parquet",
+                mime="application/octet-stream"
+            )
+        
         st.success("✅ GIS data exported successfully! CSV format compatible with QGIS and other GIS software.")
         st.info("💡 To use in QGIS: Import as CSV layer using longitude/latitude columns for coordinates.")
             
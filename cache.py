@@ -0,0 +1,115 @@
+"""
+In-process LRU caches with TTL, explicit invalidation and hit/miss counters
+
+Module state survives Streamlit reruns, so results cached here are shared by
+every rerun and every session served by the same process.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# All caches by name, for stats and bulk invalidation
+CACHES = {}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, name, maxsize=32, ttl=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'cache': self.name, 'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_MISSING = object()
+
+
+def cached(name, maxsize=32, ttl=None, key=None, copy=False):
+    """Memoize a function in a named TTLCache
+
+    ``key`` builds the cache key from the call arguments (defaults to the
+    arguments themselves, which must be hashable). Cached values are shared,
+    so callers must not mutate them unless ``copy=True`` hands out copies.
+    """
+    def decorator(func):
+        # Streamlit re-executes the app script on every rerun; keep the existing cache
+        cache = CACHES.get(name) or TTLCache(name, maxsize=maxsize, ttl=ttl)
+        make_key = key or (lambda *args, **kwargs: (args, tuple(sorted(kwargs.items()))))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = make_key(*args, **kwargs)
+            value = cache.get(cache_key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.set(cache_key, value)
+            return value.copy() if copy else value
+
+        wrapper.cache = cache
+        wrapper.invalidate = cache.invalidate
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hit/miss counters for every cache"""
+    return [cache.stats() for cache in CACHES.values()]
+
+
+def invalidate_all():
+    for cache in CACHES.values():
+        cache.invalidate()
+
+
+def frame_fingerprint(df, exclude=()):
+    """Content hash of a DataFrame, usable as a cache key"""
+    columns = [col for col in df.columns if col not in exclude]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([str(col) for col in columns]).encode())
+    digest.update(json.dumps([str(df[col].dtype) for col in columns]).encode())
+    if columns:
+        row_hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+        digest.update(np.ascontiguousarray(row_hashes).tobytes())
+    return digest.hexdigest()
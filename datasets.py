@@ -0,0 +1,127 @@
+"""
+Process-wide registry of processed datasets shared by every session
+
+A Dataset is one version of processed readings (keyed by their content
+fingerprint) with its risk analysis and the indexes derived from it (sensor
+table, rollups, correlation statistics), built on first use. Sessions hold a
+DatasetHandle instead of their own copy: sessions that load the same data
+share one Dataset, and a Dataset is dropped when the last handle to it is
+released or garbage collected with its session.
+
+Datasets are read-only. Nothing here mutates the readings, and under pandas
+copy-on-write (always on from pandas 3.0, which requirements.txt pins) any
+change a caller makes to a frame it was handed copies the affected columns
+instead of altering the shared data.
+"""
+import threading
+import time
+import weakref
+
+import pandas as pd
+
+from cache import frame_fingerprint
+from correlation import CorrelationStats
+from rollups import SensorRollups
+from sensor_table import SensorTable
+
+
+class Dataset:
+    """Processed readings of one data version with their risk analysis"""
+
+    def __init__(self, version, readings, analysis):
+        self.version = version
+        self.readings = readings
+        self.analysis = analysis
+        self.sensors = [str(s) for s in pd.unique(readings['sensor_id'])]
+        self.start = readings['timestamp'].min()
+        self.end = readings['timestamp'].max()
+        self.processed_at = time.time()
+        self.nbytes = int(readings.memory_usage(deep=True, index=False).sum())
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def _derive(self, name, build):
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build()
+            return self._derived[name]
+
+    @property
+    def table(self):
+        """Sensor-sorted query API over the readings"""
+        return self._derive('table', lambda: SensorTable(self.readings))
+
+    @property
+    def rollups(self):
+        """Hourly, daily and weekly rollups of the readings"""
+        return self._derive('rollups', lambda: SensorRollups.from_frame(self.readings))
+
+    @property
+    def correlations(self):
+        """Per-sensor correlation statistics of the readings"""
+        return self._derive('correlations', lambda: CorrelationStats.from_frame(self.readings))
+
+
+class DatasetHandle:
+    """A session's reference to a registered Dataset"""
+
+    def __init__(self, registry, dataset):
+        self.version = dataset.version
+        self._registry = registry
+        self._release = weakref.finalize(self, registry._release, dataset.version)
+
+    @property
+    def dataset(self):
+        return self._registry.get(self.version)
+
+    def release(self):
+        """Drop this reference (idempotent; also happens when the handle is collected)"""
+        self._release()
+
+
+class DatasetRegistry:
+    """Reference-counted Datasets by version"""
+
+    def __init__(self):
+        self._entries = {}
+        # Reentrant: a collected handle may release while this thread holds the lock
+        self._lock = threading.RLock()
+
+    def open(self, readings, analysis):
+        """Handle to the Dataset of these readings, registering them unless already loaded"""
+        version = frame_fingerprint(readings)
+        with self._lock:
+            entry = self._entries.get(version)
+            if entry is None:
+                entry = self._entries[version] = [Dataset(version, readings, analysis), 0]
+            entry[1] += 1
+            return DatasetHandle(self, entry[0])
+
+    def get(self, version):
+        with self._lock:
+            entry = self._entries.get(version)
+            return entry[0] if entry is not None else None
+
+    def _release(self, version):
+        with self._lock:
+            entry = self._entries.get(version)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._entries[version]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Sessions, rows and memory per registered dataset"""
+        with self._lock:
+            return [
+                {'version': version[:8], 'sessions': refs, 'rows': len(dataset.readings),
+                 'MB': round(dataset.nbytes / 2**20, 1)}
+                for version, (dataset, refs) in self._entries.items()
+            ]
+
+
+# Shared by every session served by this process
+DATASETS = DatasetRegistry()
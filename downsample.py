@@ -0,0 +1,121 @@
+"""
+Visual downsampling of time series before plotting
+
+A line chart cannot show more points than it has pixels, so long series are
+reduced to a point budget derived from the chart width before they are
+serialized for Plotly. Largest-Triangle-Three-Buckets keeps the points that
+shape the line; min/max-per-bucket keeps every bucket's extremes, which
+suits bars and spiky signals such as rainfall. Both return row positions so
+the caller can subset every column of a frame consistently.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+# Plot area of a full-width chart in the wide layout, in pixels
+CHART_WIDTH_PX = 1200
+# Points kept per horizontal pixel
+POINTS_PER_PX = 2
+# Series longer than this are drawn with WebGL (Scattergl)
+WEBGL_MIN_POINTS = 1000
+
+
+def target_points(width_px=CHART_WIDTH_PX, points_per_px=POINTS_PER_PX):
+    """Point budget of a chart ``width_px`` pixels wide"""
+    return max(3, int(width_px * points_per_px))
+
+
+def _numeric(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').view(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def _finite(y):
+    """Positions of the finite values of y"""
+    y = np.asarray(y, dtype=np.float64)
+    return np.flatnonzero(np.isfinite(y))
+
+
+def lttb(x, y, n_out):
+    """Positions of the Largest-Triangle-Three-Buckets selection of n_out points
+
+    The first and last points are always kept; each bucket in between
+    contributes the point forming the largest triangle with the previously
+    selected point and the mean of the next bucket. NaN values are skipped.
+    """
+    valid = _finite(y)
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    x = _numeric(x)[valid]
+    y = np.asarray(y, dtype=np.float64)[valid]
+
+    # n_out - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # The bucket after the last one is the final point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return valid[selected]
+
+
+def min_max(x, y, n_out):
+    """Positions of the minimum and maximum of y in each of n_out // 2 buckets, in order"""
+    valid = _finite(y)
+    n = len(valid)
+    if n_out >= n or n_out < 2:
+        return valid
+    bucket = np.arange(n) * (n_out // 2) // n
+    values = pd.Series(np.asarray(y, dtype=np.float64)[valid])
+    grouped = values.groupby(bucket, sort=True)
+    keep = np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+    return valid[keep]
+
+
+METHODS = {'lttb': lttb, 'minmax': min_max}
+
+
+def downsample(frame, x, y, n_out=None, method='lttb'):
+    """Rows of ``frame`` selected for plotting column y against column x"""
+    n_out = n_out or target_points()
+    if len(frame) <= n_out:
+        return frame
+    return frame.iloc[METHODS[method](frame[x].to_numpy(), frame[y].to_numpy(), n_out)]
+
+
+def use_webgl(n_points):
+    """Whether a series is dense enough to be drawn with Scattergl"""
+    return n_points > WEBGL_MIN_POINTS
+
+
+def benchmark(sizes=(10_000, 525_600, 5_000_000), n_out=None):
+    """Downsampling time for random-walk series of increasing length"""
+    n_out = n_out or target_points()
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        x = np.arange(n, dtype=np.int64) * 60 * 10**9
+        y = np.cumsum(rng.normal(size=n))
+        for name, method in METHODS.items():
+            start = time.perf_counter()
+            kept = method(x.view('datetime64[ns]'), y, n_out)
+            print(f"📉 {name:<7} {n:>10,} -> {len(kept):>5,} points  {time.perf_counter() - start:8.3f}s")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield downsampling benchmark")
+    benchmark()
@@ -0,0 +1,67 @@
+"""
+Headless GeoShield command line
+
+    python -m geoshield process <input>... --out <dir> [--rules rules.json] [--workers N]
+                                    [--memory-mb MB]
+
+Runs ingestion, rolling features, risk classification and export (see
+pipeline) on CSV/Parquet files or directories of them, one worker process
+per file, and prints throughput statistics at the end. With --memory-mb,
+files are streamed through the pipeline in chunks so that all workers
+together stay within that budget, whatever the size of the inputs.
+"""
+import argparse
+import time
+
+from pipeline import find_inputs, process_files
+from risk_engine import DEFAULT_RULES, load_rules
+
+
+def print_result(result):
+    if 'error' in result:
+        print(f"❌ {result['file']}: {result['error']}")
+    else:
+        print(f"✅ {result['file']}: {result['rows']:,} rows, {result['sensors']:,} sensors, "
+              f"{result['high_risk']:,} high-risk readings in {result['seconds']:.1f}s")
+
+
+def process_command(args):
+    paths = find_inputs(args.inputs)
+    if not paths:
+        print("❌ No CSV or Parquet input files found")
+        return 1
+    rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
+
+    print(f"🏔️ Processing {len(paths):,} file(s) into {args.out}...")
+    start = time.perf_counter()
+    results = process_files(paths, args.out, rules, workers=args.workers, on_result=print_result,
+                            memory_mb=args.memory_mb)
+    elapsed = time.perf_counter() - start
+
+    done = [result for result in results if 'error' not in result]
+    rows = sum(result['rows'] for result in done)
+    megabytes = sum(result['bytes'] for result in done) / 1e6
+    print(f"\n📊 {len(done):,}/{len(results):,} files, {rows:,} rows in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/s, {megabytes / elapsed:,.1f} MB/s)")
+    return 0 if len(done) == len(results) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='geoshield', description="GeoShield headless risk pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    process = commands.add_parser('process', help="Classify sensor files and export the results")
+    process.add_argument('inputs', nargs='+', help="CSV/Parquet files or directories of them")
+    process.add_argument('--out', required=True, help="Output directory")
+    process.add_argument('--rules', help="Risk rules file (JSON or YAML); defaults to the built-in rules")
+    process.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    process.add_argument('--memory-mb', type=float,
+                         help="Process out-of-core within this much memory (default: load each file whole)")
+    process.set_defaults(handler=process_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
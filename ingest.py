@@ -0,0 +1,182 @@
+"""
+Typed, chunked sensor data ingestion for the GeoShield system
+
+Readings use one compact schema from ingestion through analysis and export
+(see compact_readings): categorical sensor, site and risk level columns,
+float32 measurements, features and coordinates, and timestamps as
+datetime64[ns], i.e. int64 nanoseconds since the epoch.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_COLUMNS
+from risk_engine import RISK_DTYPE, RISK_LEVELS
+
+# Explicit column types keep multi-million row exports compact
+MEASUREMENT_COLUMNS = ['displacement_mm', 'pore_pressure_kpa', 'strain_micro', 'vibration_ms2', 'rainfall_mm']
+# float32 resolves coordinates to about a metre, finer than sensor placement
+COORDINATE_COLUMNS = ['latitude', 'longitude']
+SENSOR_DTYPES = {
+    'sensor_id': 'category',
+    **{col: 'float32' for col in MEASUREMENT_COLUMNS},
+    **{col: 'float32' for col in COORDINATE_COLUMNS},
+}
+COMPACT_DTYPES = {
+    **SENSOR_DTYPES,
+    'site_id': 'category',
+    **{col: 'float32' for col in FEATURE_COLUMNS},
+    'risk_level': RISK_DTYPE,
+}
+TIMESTAMP_DTYPE = 'datetime64[ns]'
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+PYARROW_BLOCK_SIZE = 64 << 20
+
+
+def pyarrow_available():
+    """Whether the optional pyarrow CSV engine can be used"""
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_sensor_csv(source, chunksize=DEFAULT_CHUNK_ROWS, engine=None, progress=None):
+    """Read a sensor CSV export (path or file-like) into a typed DataFrame
+
+    The file is parsed in chunks of ``chunksize`` rows (pandas engine) or
+    ``PYARROW_BLOCK_SIZE`` byte blocks (``engine='pyarrow'``). ``progress`` is
+    called as ``progress(fraction_done, rows_read)`` after every chunk.
+    """
+    chunks = list(iter_sensor_csv(source, chunksize=chunksize, engine=engine, progress=progress))
+    if not chunks:
+        return pd.DataFrame(columns=list(SENSOR_DTYPES)).astype(SENSOR_DTYPES)
+    return concat_chunks(chunks)
+
+
+def iter_sensor_csv(source, chunksize=DEFAULT_CHUNK_ROWS, engine=None, progress=None,
+                    block_size=PYARROW_BLOCK_SIZE):
+    """Yield typed DataFrame chunks from a sensor CSV export"""
+    handle = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        total_bytes = _stream_size(handle)
+        reader = _iter_pyarrow(handle, block_size) if engine == 'pyarrow' else _iter_pandas(handle, chunksize)
+
+        rows_read = 0
+        for chunk in reader:
+            chunk = _finish_chunk(chunk)
+            rows_read += len(chunk)
+            if progress is not None:
+                position = _stream_position(handle)
+                fraction = min(position / total_bytes, 1.0) if total_bytes and position is not None else 0.0
+                progress(fraction, rows_read)
+            yield chunk
+
+        if progress is not None:
+            progress(1.0, rows_read)
+    finally:
+        if handle is not source:
+            handle.close()
+
+
+def compact_readings(df):
+    """df with its known columns in the compact schema (unchanged columns are not copied)"""
+    dtypes = {col: dtype for col, dtype in COMPACT_DTYPES.items()
+              if col in df.columns and df[col].dtype != dtype}
+    if dtypes:
+        df = df.astype(dtypes)
+    if 'timestamp' in df.columns and df['timestamp'].dtype != TIMESTAMP_DTYPE:
+        df = df.assign(timestamp=pd.to_datetime(df['timestamp']).astype(TIMESTAMP_DTYPE))
+    return df
+
+
+def bytes_per_row(df):
+    """Memory per reading, including the strings of object columns"""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+
+def concat_chunks(chunks):
+    """Concatenate chunks, keeping sensor_id categorical across all of them"""
+    if len(chunks) > 1 and 'sensor_id' in chunks[0].columns:
+        categories = pd.api.types.union_categoricals(
+            [chunk['sensor_id'] for chunk in chunks], ignore_order=True
+        ).categories
+        chunks = [chunk.assign(sensor_id=chunk['sensor_id'].cat.set_categories(categories)) for chunk in chunks]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _iter_pandas(handle, chunksize):
+    yield from pd.read_csv(handle, dtype=SENSOR_DTYPES, chunksize=chunksize)
+
+
+def _iter_pyarrow(handle, block_size=PYARROW_BLOCK_SIZE):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    column_types = {
+        'sensor_id': pa.dictionary(pa.int32(), pa.string()),
+        'timestamp': pa.timestamp('ns'),
+        **{col: pa.float32() for col in MEASUREMENT_COLUMNS},
+        **{col: pa.float32() for col in COORDINATE_COLUMNS},
+    }
+    reader = pacsv.open_csv(
+        handle,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(column_types=column_types),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _finish_chunk(chunk):
+    if 'timestamp' in chunk.columns and not pd.api.types.is_datetime64_any_dtype(chunk['timestamp']):
+        try:
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], format='ISO8601')
+        except (ValueError, TypeError):
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+    return chunk
+
+
+def _stream_size(handle):
+    size = getattr(handle, 'size', None)
+    if size is not None:
+        return size
+    try:
+        position = handle.tell()
+        size = handle.seek(0, os.SEEK_END)
+        handle.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _stream_position(handle):
+    try:
+        return handle.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def schema_report(n_rows=1_000_000, n_sensors=1_000):
+    """Bytes per reading of processed data with plain columns and in the compact schema"""
+    from sample_data import SensorNetwork
+
+    df = SensorNetwork(n_sensors=n_sensors, days=n_rows / n_sensors / 24, interval_minutes=60).frame()
+    df['site_id'] = 'SITE_001'
+    df = df.assign(**{col: np.zeros(len(df), dtype=np.float32) for col in FEATURE_COLUMNS})
+    df['risk_level'] = pd.Categorical.from_codes(np.arange(len(df)) % len(RISK_LEVELS), dtype=RISK_DTYPE)
+
+    # Object strings and float64, as pandas infers them from a CSV or from records
+    plain = df.astype({col: object for col in ('sensor_id', 'site_id', 'risk_level')})
+    plain = plain.astype({col: np.float64 for col in plain.columns if plain[col].dtype == np.float32})
+    for label, frame in (('plain', plain), ('compact', compact_readings(plain))):
+        per_row = bytes_per_row(frame)
+        print(f"📦 {label:<8} {per_row:7.1f} bytes/row  {per_row * 1e6 / 2**20:8.1f} MB per million readings")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield reading schema report")
+    schema_report()
@@ -0,0 +1,444 @@
+"""
+Tiled multi-resolution pyramids for orthophoto overlays
+
+An uploaded orthophoto is decoded once into memory-mapped arrays (full
+resolution plus successive 2x reductions) and cut into XYZ web map tiles on
+local disk, which Streamlit's static file serving hands to the map, so the
+browser only loads the tiles visible at the current zoom. Pyramids are keyed
+by a hash of the image content, so uploading the same image again reuses the
+existing tiles.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Decoded levels (not served) and tiles (served as /app/static/orthophotos/...)
+ORTHO_DIR = os.environ.get('GEOSHIELD_ORTHO', os.path.join(BASE_DIR, 'data', 'orthophotos'))
+TILE_DIR = os.path.join(BASE_DIR, 'static', 'orthophotos')
+TILE_URL = '/app/static/orthophotos/{key}/{{z}}/{{x}}/{{y}}.png'
+
+TILE_SIZE = 256
+# Longest side of upload previews, in pixels
+PREVIEW_SIZE = 1024
+MAX_ZOOM = 22
+# Largest image PIL may decode (the default limit guards against decompression bombs)
+MAX_IMAGE_PIXELS = 2_000_000_000
+HASH_BLOCK = 16 << 20
+# Image rows decoded at a time into the full-resolution level
+DECODE_ROWS = 1024
+
+# GeoTIFF tags: ModelPixelScale and ModelTiepoint
+_PIXEL_SCALE_TAG = 33550
+_TIEPOINT_TAG = 33922
+_ORIENTATION_TAG = 0x0112
+
+
+def content_hash(source):
+    """Hash of a file's content (path or binary file-like), read in blocks"""
+    handle = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        if handle is source:
+            handle.seek(0)
+        for block in iter(lambda: handle.read(HASH_BLOCK), b''):
+            digest.update(block)
+    finally:
+        if handle is source:
+            handle.seek(0)
+        else:
+            handle.close()
+    return digest.hexdigest()
+
+
+def geotiff_bounds(image):
+    """(south, west, north, east) of a GeoTIFF in geographic coordinates, if it has them"""
+    tags = getattr(image, 'tag_v2', None)
+    if tags is None or _PIXEL_SCALE_TAG not in tags or _TIEPOINT_TAG not in tags:
+        return None
+    scale_x, scale_y = tags[_PIXEL_SCALE_TAG][:2]
+    i, j, _, x, y = tags[_TIEPOINT_TAG][:5]
+    west, north = x - i * scale_x, y + j * scale_y
+    east, south = west + image.width * scale_x, north - image.height * scale_y
+    # Projected (metric) GeoTIFFs are not reprojected
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        return None
+    return (south, west, north, east)
+
+
+def _pixel_bytes(mode):
+    from PIL import Image
+
+    return len(Image.new(mode, (1, 1)).tobytes())
+
+
+def _row_bands(image, rows=DECODE_ROWS):
+    """Stored tiles of an image grouped into bands of about ``rows`` rows that decode on their own
+
+    Strip and tile based files (e.g. TIFF) list independent tiles, and an
+    uncompressed stream splits at any row. Returns [(top, bottom, tiles)], or
+    None when the image is one compressed stream (JPEG, PNG, compressed TIFF
+    read through libtiff) that can only be decoded as a whole.
+    """
+    tiles = []
+    for tile in image.tile:
+        codec, (x0, y0, x1, y1), offset, args = tile[:4]
+        if codec == 'raw' and isinstance(args, tuple) and len(args) == 3 and args[0] == image.mode and args[2] == 1:
+            stride = args[1] or (x1 - x0) * _pixel_bytes(image.mode)
+            for top in range(y0, y1, rows):
+                tiles.append(type(tile)(
+                    codec, (x0, top, x1, min(top + rows, y1)), offset + (top - y0) * stride, (args[0], stride, 1)
+                ))
+        elif len(image.tile) > 1 and codec != 'libtiff':
+            tiles.append(tile)
+        else:
+            return None
+    # Orientation tags transpose the decoded image, which bands cannot follow
+    if not tiles or image.getexif().get(_ORIENTATION_TAG, 1) != 1:
+        return None
+
+    bands = []
+    for tile in sorted(tiles, key=lambda tile: tile[1][1]):
+        top, bottom = tile[1][1], tile[1][3]
+        # Tiles of one tile row share a band; a band grows until it has enough rows
+        if bands and (top < bands[-1][1] or bands[-1][1] - bands[-1][0] < rows):
+            bands[-1][1] = max(bands[-1][1], bottom)
+            bands[-1][2].append(tile)
+        else:
+            bands.append([top, bottom, [tile]])
+    return bands
+
+
+def _decode_band(source, top, bottom, tiles):
+    """RGB pixels of rows top:bottom, decoding only the given tiles"""
+    from PIL import Image
+
+    with Image.open(source) as band:
+        band.tile = [
+            type(tile)(tile[0], (tile[1][0], tile[1][1] - top, tile[1][2], tile[1][3] - top), *tile[2:])
+            for tile in tiles
+        ]
+        band._size = (band.width, bottom - top)
+        if hasattr(band, '_tile_size'):
+            # TIFF sizes its decode buffer separately
+            band._tile_size = band._size
+        return np.asarray(band.convert('RGB'))
+
+
+def _tile_x(lon, zoom):
+    return (lon + 180) / 360 * 2 ** zoom
+
+
+def _tile_y(lat, zoom):
+    lat = np.radians(lat)
+    return (1 - np.arcsinh(np.tan(lat)) / np.pi) / 2 * 2 ** zoom
+
+
+def _tile_lat(y, zoom):
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / 2 ** zoom))))
+
+
+class OrthophotoPyramid:
+    """Decoded resolution levels and XYZ tiles of one orthophoto"""
+
+    def __init__(self, key):
+        self.key = key
+        self.level_dir = os.path.join(ORTHO_DIR, key)
+        self.tile_dir = os.path.join(TILE_DIR, key)
+        self.progress = 0.0
+        self.error = None
+
+    @property
+    def metadata_path(self):
+        return os.path.join(self.tile_dir, 'metadata.json')
+
+    @property
+    def ready(self):
+        """Whether every tile has been written (metadata is written last)"""
+        return os.path.exists(self.metadata_path)
+
+    @property
+    def metadata(self):
+        with open(self.metadata_path) as f:
+            return json.load(f)
+
+    @property
+    def tile_url(self):
+        return TILE_URL.format(key=self.key)
+
+    def levels(self):
+        """Memory-mapped (height, width, 3) arrays, full resolution first"""
+        names = sorted(name for name in os.listdir(self.level_dir) if name.startswith('level-'))
+        return [np.load(os.path.join(self.level_dir, name), mmap_mode='r') for name in names]
+
+    def decode(self, source):
+        """Decode the image once into memory-mapped levels; returns its GeoTIFF bounds if any
+
+        Pixels are written to the full-resolution level in row bands. Strip
+        and tile based files are decoded band by band, so memory stays at one
+        band; single-stream formats are decoded once and converted to RGB a
+        band at a time.
+        """
+        from PIL import Image
+
+        os.makedirs(self.level_dir, exist_ok=True)
+        Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+        with Image.open(source) as image:
+            bounds = geotiff_bounds(image)
+            width, height = image.size
+            level = np.lib.format.open_memmap(
+                os.path.join(self.level_dir, 'level-00.npy'), mode='w+', dtype=np.uint8, shape=(height, width, 3)
+            )
+            bands = _row_bands(image) if isinstance(source, (str, os.PathLike)) else None
+            if bands is not None:
+                for top, bottom, tiles in bands:
+                    level[top:bottom] = _decode_band(source, top, bottom, tiles)
+            else:
+                for top in range(0, height, DECODE_ROWS):
+                    bottom = min(top + DECODE_ROWS, height)
+                    level[top:bottom] = np.asarray(image.crop((0, top, width, bottom)).convert('RGB'))
+        level.flush()
+
+        # Successive 2x2 mean reductions, in row blocks so no level is copied into memory
+        index = 0
+        while max(level.shape[:2]) > TILE_SIZE:
+            height, width = level.shape[0] // 2, level.shape[1] // 2
+            index += 1
+            reduced = np.lib.format.open_memmap(
+                os.path.join(self.level_dir, f'level-{index:02d}.npy'), mode='w+', dtype=np.uint8,
+                shape=(height, width, 3)
+            )
+            for row in range(0, height, 1024):
+                block = level[2 * row:2 * min(row + 1024, height), :2 * width].astype(np.uint16)
+                reduced[row:row + 1024] = (
+                    (block[0::2, 0::2] + block[1::2, 0::2] + block[0::2, 1::2] + block[1::2, 1::2] + 2) // 4
+                )
+            reduced.flush()
+            level = reduced
+        return bounds
+
+    def zoom_range(self, bounds, width):
+        """Zoom levels from the whole image in about one tile to its native resolution"""
+        south, west, north, east = bounds
+        tiles_at_zero = _tile_x(east, 0) - _tile_x(west, 0)
+        native = int(np.round(np.log2(width / (TILE_SIZE * tiles_at_zero))))
+        native = int(np.clip(native, 0, MAX_ZOOM))
+        return max(0, native - int(np.ceil(np.log2(max(width / TILE_SIZE, 1))))), native
+
+    def build_tiles(self, bounds, progress=None):
+        """Write every XYZ tile covering the image, coarse zoom levels first"""
+        from PIL import Image
+
+        levels = self.levels()
+        full_height, full_width = levels[0].shape[:2]
+        south, west, north, east = bounds
+        min_zoom, max_zoom = self.zoom_range(bounds, full_width)
+
+        zoom_tiles = []
+        for zoom in range(min_zoom, max_zoom + 1):
+            x0, x1 = int(_tile_x(west, zoom)), int(np.ceil(_tile_x(east, zoom)))
+            y0, y1 = int(_tile_y(north, zoom)), int(np.ceil(_tile_y(south, zoom)))
+            zoom_tiles.append((zoom, range(x0, x1), range(y0, y1)))
+        total = sum(len(xs) * len(ys) for _, xs, ys in zoom_tiles)
+
+        written = 0
+        pixel = np.arange(TILE_SIZE) + 0.5
+        for zoom, xs, ys in zoom_tiles:
+            # Finest decoded level that is still at least as detailed as this zoom
+            source_per_tile_px = full_width / ((_tile_x(east, zoom) - _tile_x(west, zoom)) * TILE_SIZE)
+            level = levels[int(np.clip(np.floor(np.log2(max(source_per_tile_px, 1))), 0, len(levels) - 1))]
+            height, width = level.shape[:2]
+
+            # Source rows of every tile row are shared by all tiles of a zoom level
+            tile_rows = {}
+            for y in ys:
+                lat = _tile_lat(y + pixel / TILE_SIZE, zoom)
+                rows = np.floor((north - lat) / (north - south) * height).astype(np.int64)
+                tile_rows[y] = (rows, (rows >= 0) & (rows < height))
+
+            for x in xs:
+                lon = (x + pixel / TILE_SIZE) / 2 ** zoom * 360 - 180
+                cols = np.floor((lon - west) / (east - west) * width).astype(np.int64)
+                col_inside = (cols >= 0) & (cols < width)
+                for y in ys:
+                    rows, row_inside = tile_rows[y]
+                    written += 1
+                    if not row_inside.any() or not col_inside.any():
+                        continue
+
+                    # Nearest-neighbour resampling; pixels outside the image stay transparent
+                    tile = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+                    inside = np.ix_(row_inside, col_inside)
+                    tile[..., :3][inside] = level[np.ix_(rows[row_inside], cols[col_inside])]
+                    tile[..., 3][inside] = 255
+                    path = os.path.join(self.tile_dir, str(zoom), str(x))
+                    os.makedirs(path, exist_ok=True)
+                    Image.fromarray(tile, 'RGBA').save(os.path.join(path, f'{y}.png'), compress_level=1)
+                self.progress = written / total
+                if progress is not None:
+                    progress(self.progress)
+        return min_zoom, max_zoom
+
+    def build(self, source, bounds=None):
+        """Decode and tile the image; ``bounds`` are used when it is not a geographic GeoTIFF"""
+        start = time.perf_counter()
+        try:
+            georeferenced = self.decode(source)
+            bounds = georeferenced or bounds
+            if bounds is None:
+                raise ValueError("Orthophoto has no geographic bounds")
+            height, width = self.levels()[0].shape[:2]
+            min_zoom, max_zoom = self.build_tiles(bounds)
+
+            metadata = {
+                'bounds': list(bounds), 'width': width, 'height': height,
+                'min_zoom': min_zoom, 'max_zoom': max_zoom, 'georeferenced': georeferenced is not None,
+                'build_seconds': round(time.perf_counter() - start, 2)
+            }
+            with open(self.metadata_path, 'w') as f:
+                json.dump(metadata, f)
+        except Exception as e:
+            self.error = str(e)
+            shutil.rmtree(self.tile_dir, ignore_errors=True)
+            raise
+
+
+def _open_reduced(source, max_size):
+    """Open an image lazily, switching to its smallest stored resolution still >= max_size
+
+    JPEGs are decoded at a reduced DCT scale (draft mode); multi-resolution
+    TIFFs use their smallest sufficient overview page. Nothing is decoded
+    until the caller reads pixels.
+    """
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    image = Image.open(source)
+    if getattr(image, 'n_frames', 1) > 1:
+        sizes = []
+        for frame in range(image.n_frames):
+            image.seek(frame)
+            sizes.append(image.size)
+        sufficient = [i for i, size in enumerate(sizes) if max(size) >= max_size]
+        image.seek(min(sufficient, key=lambda i: max(sizes[i])) if sufficient else 0)
+    image.draft('RGB', (max_size, max_size))
+    return image
+
+
+def preview_image(key, source=None, max_size=PREVIEW_SIZE):
+    """Path of a JPEG preview (longest side at most ``max_size``), cached on disk by content hash
+
+    Decoded pyramid levels are used when the pyramid is built; otherwise the
+    preview is read from ``source`` (or the upload copy kept for the build)
+    at the lowest resolution the format allows.
+    """
+    from PIL import Image
+
+    preview_dir = os.path.join(ORTHO_DIR, key)
+    path = os.path.join(preview_dir, f'preview-{max_size}.jpg')
+    if os.path.exists(path):
+        return path
+    os.makedirs(preview_dir, exist_ok=True)
+
+    pyramid = OrthophotoPyramid(key)
+    if pyramid.ready:
+        levels = pyramid.levels()
+        level = next((level for level in reversed(levels) if max(level.shape[:2]) >= max_size), levels[0])
+        image = Image.fromarray(np.asarray(level))
+    else:
+        copy = os.path.join(preview_dir, 'source')
+        image = _open_reduced(copy if os.path.exists(copy) else source, max_size)
+
+    with image:
+        preview = image.convert('RGB')
+        preview.thumbnail((max_size, max_size))
+    # Write then rename, so a concurrent reader never sees a partial preview
+    preview.save(path + '.tmp', 'JPEG', quality=85)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+# Pyramids being built and build errors, by content hash
+_building = {}
+_failed = {}
+_building_lock = threading.Lock()
+PYRAMID_WORKER = ThreadPoolExecutor(max_workers=1, thread_name_prefix='geoshield-orthophoto')
+
+
+def request_pyramid(source, bounds=None, key=None):
+    """Pyramid for an image (path or file-like), building it in the background if needed
+
+    The image is keyed by its content hash; an existing pyramid for the same
+    content is returned as is. File-like sources are first copied to disk so
+    the build does not depend on the caller keeping the upload around.
+    """
+    key = key or content_hash(source)
+    with _building_lock:
+        if key in _building:
+            return _building[key]
+        pyramid = OrthophotoPyramid(key)
+        if pyramid.ready:
+            return pyramid
+        _failed.pop(key, None)
+
+        os.makedirs(pyramid.level_dir, exist_ok=True)
+        copy = None
+        if not isinstance(source, (str, os.PathLike)):
+            copy = os.path.join(pyramid.level_dir, 'source')
+            source.seek(0)
+            with open(copy, 'wb') as f:
+                shutil.copyfileobj(source, f, HASH_BLOCK)
+            source.seek(0)
+            source = copy
+
+        def build():
+            try:
+                pyramid.build(source, bounds)
+                # The decoded levels replace the upload copy
+                if copy is not None:
+                    os.remove(copy)
+            except Exception:
+                with _building_lock:
+                    _failed[key] = pyramid.error
+            finally:
+                with _building_lock:
+                    _building.pop(key, None)
+
+        _building[key] = pyramid
+        PYRAMID_WORKER.submit(build)
+        return pyramid
+
+
+def get_pyramid(key):
+    """Pyramid for a content hash: the one being built, or its state on disk"""
+    with _building_lock:
+        if key in _building:
+            return _building[key]
+        pyramid = OrthophotoPyramid(key)
+        pyramid.error = _failed.get(key)
+        return pyramid
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the XYZ tile pyramid of an orthophoto")
+    parser.add_argument('image')
+    parser.add_argument('--bounds', type=float, nargs=4, metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'),
+                        help="Geographic bounds when the image is not a GeoTIFF")
+    args = parser.parse_args()
+
+    pyramid = OrthophotoPyramid(content_hash(args.image))
+    if pyramid.ready:
+        print(f"✅ Pyramid already built: {pyramid.tile_dir}")
+    else:
+        pyramid.build(args.image, args.bounds)
+        metadata = pyramid.metadata
+        print(f"✅ Built zoom {metadata['min_zoom']}-{metadata['max_zoom']} in {metadata['build_seconds']}s: "
+              f"{pyramid.tile_dir}")
@@ -0,0 +1,223 @@
+"""
+Multi-core risk classification and aggregation over sensor partitions
+
+Classification and per-sensor aggregation only ever combine readings of the
+same sensor, so the readings are cut into contiguous blocks of whole sensors
+and processed by a pool of worker processes. Columns are copied once into
+shared memory (text columns as integer codes) and every worker reads its rows
+there as zero-copy views instead of receiving a pickled DataFrame. Workers
+write risk codes straight into a shared output array and return only their
+small RiskAggregates, which are merged with RiskAggregates.combine.
+
+The pool is opt-in: set GEOSHIELD_WORKERS (a count, or 0 for one per CPU)
+or pass ``workers``. Copying into shared memory costs about as much as the
+in-process classification it replaces, so with the default everything runs
+in-process until the pool has been measured to pay off on the machine. The
+pool is created on first use and kept. Small inputs and calls made from
+inside a worker process always run in-process.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from aggregates import RiskAggregates
+from risk_engine import DEFAULT_RULES, RISK_DTYPE, classify_risk
+from sensor_table import sensor_codes, sort_order
+
+# Worker processes used by default: 1 (in-process) unless configured, 0 for one per CPU
+PARALLEL_WORKERS = int(os.environ.get('GEOSHIELD_WORKERS', '1'))
+# Inputs smaller than this are classified in-process
+PARALLEL_MIN_ROWS = 20_000_000
+# Partitions per worker, so uneven sensors still balance across the pool
+PARTITIONS_PER_WORKER = 4
+# Columns aggregation and rule scoping read besides the columns the rules compare
+BASE_COLUMNS = ['sensor_id', 'site_id', 'timestamp', 'latitude', 'longitude']
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def worker_pool(workers):
+    """Process pool reused across calls, so workers start (and import pandas) once"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: never fork a process that may be running Streamlit or worker threads
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def default_workers():
+    """Worker processes to use: PARALLEL_WORKERS (0 for one per CPU), or 1 inside a worker process"""
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return PARALLEL_WORKERS or os.cpu_count() or 1
+
+
+def classify_and_aggregate(df, rules=None, workers=None, min_rows=PARALLEL_MIN_ROWS):
+    """Risk levels (aligned with df) and per-sensor RiskAggregates, in parallel when worthwhile"""
+    workers = workers or default_workers()
+    if workers <= 1 or len(df) < min_rows:
+        risk_level = classify_risk(df, rules)
+        return risk_level, RiskAggregates.from_frame(df, risk_level.codes)
+    return _classify_partitioned(df, rules, workers)
+
+
+def rule_columns(rules):
+    """Columns compared by a rule set's conditions"""
+    if isinstance(rules, dict):
+        found = [rules['column']] if 'column' in rules else []
+        return found + [col for value in rules.values() for col in rule_columns(value)]
+    if isinstance(rules, list):
+        return [col for value in rules for col in rule_columns(value)]
+    return []
+
+
+class _SharedColumns:
+    """Columns of a frame copied into shared memory blocks, in (sensor, time) order"""
+
+    def __init__(self, df, order=None):
+        self.n_rows = len(df)
+        self.blocks = []
+        self.spec = []
+        for name in df.columns:
+            column = df[name]
+            categories = None
+            if pd.api.types.is_datetime64_any_dtype(column):
+                values = column.to_numpy(dtype='datetime64[ns]').view(np.int64)
+                kind = 'datetime'
+            elif pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+                values = column.to_numpy()
+                kind = 'numeric'
+            else:
+                categorical = pd.Categorical(column)
+                values, categories = categorical.codes, list(categorical.categories)
+                kind = 'categorical'
+            self.spec.append((name, kind, self._share(values, order), values.dtype.str, categories))
+        self.risk = self._share(np.zeros(self.n_rows, dtype=np.int8))
+
+    def _share(self, values, order=None):
+        block = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+        target = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+        # Reorder straight into the block rather than through a sorted copy
+        if order is None:
+            target[:] = values
+        else:
+            np.take(values, order, out=target)
+        del target
+        self.blocks.append(block)
+        return block.name
+
+    def release(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+def _attach(name, dtype, n_rows, start, stop):
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray((n_rows,), dtype=dtype, buffer=block.buf)[start:stop]
+
+
+def _classify_rows(spec, risk_name, n_rows, start, stop, rules):
+    """Worker: classify and aggregate rows start:stop of the shared columns
+
+    The frame is built over views of the shared blocks without copying; every
+    reference to it is dropped before the blocks are closed.
+    """
+    blocks, columns = [], {}
+    frame = risk_level = None
+    try:
+        for name, kind, block_name, dtype, categories in spec:
+            block, values = _attach(block_name, dtype, n_rows, start, stop)
+            blocks.append(block)
+            if kind == 'datetime':
+                columns[name] = values.view('datetime64[ns]')
+            elif kind == 'categorical':
+                columns[name] = pd.Categorical.from_codes(values, categories=categories, validate=False)
+            else:
+                columns[name] = values
+            del values
+        frame = pd.DataFrame(columns, copy=False)
+        columns.clear()
+
+        risk_level = classify_risk(frame, rules)
+        block, risk = _attach(risk_name, np.int8, n_rows, start, stop)
+        blocks.append(block)
+        risk[:] = risk_level.codes
+        del risk
+        return RiskAggregates.from_frame(frame, risk_level.codes)
+    finally:
+        columns.clear()
+        frame = risk_level = None
+        for block in blocks:
+            block.close()
+
+
+def _partitions(codes, n_parts):
+    """Row boundaries cutting sensor-sorted rows into about n_parts blocks of whole sensors"""
+    sensor_starts = np.flatnonzero(np.diff(codes, prepend=codes[0] - 1))
+    targets = np.linspace(0, len(codes), n_parts + 1)[1:-1]
+    cuts = sensor_starts[np.minimum(np.searchsorted(sensor_starts, targets), len(sensor_starts) - 1)]
+    return np.unique(np.concatenate([[0], cuts, [len(codes)]]))
+
+
+def _classify_partitioned(df, rules, workers):
+    codes, _ = sensor_codes(df['sensor_id'])
+    timestamps = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    order = sort_order(codes, timestamps)
+    if order is not None:
+        codes = codes[order]
+    bounds = _partitions(codes, workers * PARTITIONS_PER_WORKER)
+
+    # Only the columns the workers read are shared
+    needed = dict.fromkeys(BASE_COLUMNS + rule_columns(DEFAULT_RULES if rules is None else rules))
+    shared = _SharedColumns(df[[col for col in needed if col in df.columns]], order)
+    try:
+        parts = list(worker_pool(workers).map(
+            _classify_rows,
+            *zip(*[(shared.spec, shared.risk, shared.n_rows, start, stop, rules)
+                   for start, stop in zip(bounds[:-1], bounds[1:])])
+        ))
+        risk = np.ndarray((shared.n_rows,), dtype=np.int8, buffer=shared.blocks[-1].buf).copy()
+    finally:
+        shared.release()
+
+    if order is not None:
+        unsorted = np.empty_like(risk)
+        unsorted[order] = risk
+        risk = unsorted
+    return pd.Categorical.from_codes(risk, dtype=RISK_DTYPE), RiskAggregates.combine(parts)
+
+
+def benchmark(n_rows=10_000_000, n_sensors=1_000):
+    """In-process against partitioned classification and aggregation"""
+    from sample_data import SensorNetwork
+
+    df = SensorNetwork(n_sensors=n_sensors, days=n_rows / n_sensors / 24, interval_minutes=60).frame()
+    start = time.perf_counter()
+    classify_and_aggregate(df, workers=1)
+    print(f"⚙️ in-process   {len(df):>12,} rows  {time.perf_counter() - start:8.3f}s")
+
+    # Forced through the pool even on one CPU, to show its overhead there
+    workers = max(2, os.cpu_count() or 1)
+    for label in ('cold pool', 'warm pool'):
+        start = time.perf_counter()
+        _classify_partitioned(df, None, workers)
+        print(f"⚙️ {workers:>2} workers, {label} {len(df):>12,} rows  {time.perf_counter() - start:8.3f}s")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield parallel risk analysis benchmark")
+    benchmark()
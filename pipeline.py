@@ -0,0 +1,300 @@
+"""
+Compute core of the GeoShield risk pipeline, free of any UI code
+
+prepare_readings validates and orders readings and adds the rolling
+features, perform_risk_analysis classifies them and builds the per-sensor
+summaries, and process_file runs both on one CSV/Parquet file and exports
+the results. The Streamlit app and the headless CLI (geoshield.py) share
+these functions; errors are raised rather than shown.
+
+analyze_out_of_core runs the same steps over chunks of bounded size for
+inputs larger than memory: only the per-sensor aggregates and each sensor's
+last few days (for the rolling features) are kept between chunks, and
+classified readings, with the same columns as in memory, are written out
+chunk by chunk. process_file uses it when given a memory budget.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from cache import cached, frame_fingerprint
+from aggregates import RiskAggregates
+from features import RollingFeatures, add_rolling_features
+from ingest import compact_readings, iter_sensor_csv, pyarrow_available, read_sensor_csv
+from parallel import classify_and_aggregate
+from risk_engine import classify_risk
+from sensor_table import sort_readings
+from spatial_index import SensorIndex
+
+REQUIRED_COLUMNS = ['sensor_id', 'timestamp', 'displacement_mm', 'rainfall_mm']
+INPUT_SUFFIXES = ('.csv', '.parquet')
+# Peak working memory per row of a chunk: the parsed row, float64 temporaries of
+# the features and rules, and the export copy
+WORKING_BYTES_PER_ROW = 400
+# CSV text per reading, to turn a row budget into pyarrow parse blocks
+CSV_BYTES_PER_ROW = 110
+MIN_CHUNK_ROWS = 10_000
+
+
+def validate_readings(df):
+    """Check required columns and add coordinates if not present, in the compact schema"""
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    # Add coordinates if not present
+    if 'latitude' not in df.columns or 'longitude' not in df.columns:
+        df['latitude'] = 40.7128 + np.random.normal(0, 0.01, len(df))
+        df['longitude'] = -74.0060 + np.random.normal(0, 0.01, len(df))
+    return compact_readings(df)
+
+
+def prepare_readings(df):
+    """Validated readings sorted by (sensor_id, timestamp), with rolling features"""
+    df = validate_readings(df)
+
+    # Sorted readings make per-sensor queries slices
+    return add_rolling_features(sort_readings(df))
+
+
+def perform_risk_analysis(df, rules=None):
+    """Perform risk analysis based on established geotechnical rules
+
+    Returns the classified readings (a new frame sharing df's columns; df is
+    not modified) and the per-sensor summaries.
+    """
+    analysis = analyze_risk(df, rules)
+    readings = df.assign(risk_level=analysis['risk_level'])
+    return readings, {key: value for key, value in analysis.items() if key != 'risk_level'}
+
+
+@cached(
+    'risk_analysis', maxsize=8, ttl=3600,
+    key=lambda df, rules=None: (
+        frame_fingerprint(df, exclude=('risk_level',)),
+        json.dumps(rules, sort_keys=True)
+    )
+)
+def analyze_risk(df, rules=None):
+    """Risk levels and per-sensor summaries, cached by data and rules"""
+
+    # Compiled, vectorized rules and per-sensor aggregates (over sensor partitions in
+    # parallel for large inputs when GEOSHIELD_WORKERS enables the pool); the
+    # aggregates can later absorb new rows incrementally
+    risk_level, aggregates = classify_and_aggregate(df, rules)
+    analysis = aggregates.to_analysis()
+
+    return {
+        'risk_level': risk_level,
+        'aggregates': aggregates,
+        'spatial_index': SensorIndex.from_locations(analysis['sensor_locations']),
+        **analysis
+    }
+
+
+def read_readings(path):
+    """Readings from a sensor CSV export or a Parquet file"""
+    if str(path).lower().endswith('.parquet'):
+        return compact_readings(pd.read_parquet(path))
+    return read_sensor_csv(path, engine='pyarrow' if pyarrow_available() else None)
+
+
+def chunk_rows_for(memory_mb):
+    """Readings per chunk that keep out-of-core processing within memory_mb
+
+    The budget covers the data being processed; the interpreter and its
+    libraries add a fixed ~300 MB on top.
+    """
+    return max(MIN_CHUNK_ROWS, int(memory_mb * 2**20 / WORKING_BYTES_PER_ROW))
+
+
+def iter_readings(path, chunk_rows):
+    """Chunks of about chunk_rows readings from a sensor CSV export or a Parquet file"""
+    if str(path).lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield compact_readings(batch.to_pandas())
+    elif pyarrow_available():
+        yield from iter_sensor_csv(path, engine='pyarrow', block_size=chunk_rows * CSV_BYTES_PER_ROW)
+    else:
+        yield from iter_sensor_csv(path, chunksize=chunk_rows)
+
+
+def analyze_out_of_core(chunks, rules=None, on_chunk=None):
+    """Risk analysis of readings arriving in chunks, holding one chunk at a time
+
+    Returns the same summaries and totals as perform_risk_analysis over all
+    the readings, plus 'rows'. ``on_chunk`` receives every classified chunk
+    (e.g. to write it out), sorted by (sensor_id, timestamp) and with the
+    rolling features, like prepare_readings output. The features' history
+    (HISTORY_WINDOW of every sensor) is kept in addition to the chunk.
+
+    Rows within a chunk may be in any order, but a sensor's readings must not
+    go back in time from one chunk to the next (e.g. input sorted by time, or
+    by sensor and time); a ValueError is raised when they do.
+    """
+    features = RollingFeatures()
+    aggregates = RiskAggregates()
+    latest = pd.Series(dtype='datetime64[ns]')
+    rows = 0
+    for chunk in chunks:
+        chunk = sort_readings(validate_readings(chunk))
+        latest = _check_time_order(chunk, latest)
+        chunk = features.update(chunk)
+        risk_level = classify_risk(chunk, rules)
+        aggregates.update(chunk, risk_level.codes)
+        rows += len(chunk)
+        if on_chunk:
+            on_chunk(chunk.assign(risk_level=risk_level))
+
+    return {'aggregates': aggregates, 'rows': rows, **aggregates.to_analysis()}
+
+
+def _check_time_order(chunk, latest):
+    """Latest reading per sensor after chunk, raising if chunk goes back before ``latest``"""
+    span = chunk.groupby(chunk['sensor_id'].astype(str), sort=False)['timestamp'].agg(['min', 'max'])
+    previous = latest.reindex(span.index)
+    behind = span['min'] < previous
+    if behind.any():
+        sensor = behind.idxmax()
+        raise ValueError(
+            f"Readings of sensor {sensor} go back in time across chunks ({span.at[sensor, 'min']} "
+            f"after {previous[sensor]}); out-of-core processing needs each sensor's readings in "
+            f"time order, e.g. sorted by timestamp"
+        )
+    return span['max'].combine_first(latest)
+
+
+class ReadingsWriter:
+    """Appends classified chunks to one readings file (Parquet, or CSV without pyarrow)"""
+
+    def __init__(self, out_dir, name):
+        os.makedirs(out_dir, exist_ok=True)
+        self.parquet = pyarrow_available()
+        self.path = os.path.join(out_dir, f'{name}.readings' + ('.parquet' if self.parquet else '.csv'))
+        self._writer = None
+        self._chunks = 0
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='w' if self._chunks == 0 else 'a', header=self._chunks == 0, index=False)
+        self._chunks += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_summaries(analysis, out_dir, name):
+    """Write per-sensor risk summary and locations; returns the written paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    summary_path = os.path.join(out_dir, f'{name}.risk_summary.csv')
+    analysis['risk_summary'].to_csv(summary_path)
+    locations_path = os.path.join(out_dir, f'{name}.sensor_locations.csv')
+    analysis['sensor_locations'].to_csv(locations_path, index=False)
+    return [summary_path, locations_path]
+
+
+def export_results(df, analysis, out_dir, name):
+    """Write classified readings and per-sensor summaries; returns the written paths"""
+    with ReadingsWriter(out_dir, name) as writer:
+        writer.write(df)
+    return [writer.path, *export_summaries(analysis, out_dir, name)]
+
+
+def process_file(path, out_dir, rules=None, memory_mb=None):
+    """Ingest, featurize, classify and export one file; returns its processing statistics
+
+    With ``memory_mb`` the file is processed out-of-core in chunks sized to
+    that budget (see analyze_out_of_core) instead of being loaded whole.
+    """
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(path))[0]
+    if memory_mb:
+        with ReadingsWriter(out_dir, name) as writer:
+            analysis = analyze_out_of_core(iter_readings(path, chunk_rows_for(memory_mb)), rules, writer.write)
+        export_summaries(analysis, out_dir, name)
+        rows = analysis['rows']
+    else:
+        df, analysis = perform_risk_analysis(prepare_readings(read_readings(path)), rules)
+        export_results(df, analysis, out_dir, name)
+        rows = len(df)
+
+    return {
+        'file': str(path),
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'sensors': len(analysis['sensor_locations']),
+        'high_risk': analysis['total_high_risk'],
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def find_inputs(paths):
+    """CSV and Parquet files among paths, expanding directories (non-recursive)"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(INPUT_SUFFIXES)
+            )
+        else:
+            found.append(path)
+    return found
+
+
+def _process_file_or_error(path, out_dir, rules, memory_mb=None):
+    try:
+        return process_file(path, out_dir, rules, memory_mb)
+    except Exception as e:
+        return {'file': str(path), 'error': str(e)}
+
+
+def process_files(paths, out_dir, rules=None, workers=None, on_result=None, memory_mb=None):
+    """Process files in parallel worker processes (in-process for one file or worker)
+
+    A failing file does not stop the others; its result has an 'error' key.
+    ``on_result`` is called with each file's result as it completes.
+    ``memory_mb`` bounds the memory of all workers together: each processes
+    its file out-of-core within an equal share.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    memory_mb = memory_mb / workers if memory_mb else None
+    results = []
+    if workers == 1:
+        for path in paths:
+            results.append(_process_file_or_error(path, out_dir, rules, memory_mb))
+            if on_result:
+                on_result(results[-1])
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_process_file_or_error, path, out_dir, rules, memory_mb) for path in paths]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if on_result:
+                on_result(results[-1])
+    return results
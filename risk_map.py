@@ -0,0 +1,242 @@
+"""
+Risk zone map shared by the Dashboard and Map Analysis pages
+
+All sensors are drawn by a single marker-cluster layer whose points are
+shipped as one compact JSON array and turned into circle markers in the
+browser, instead of one folium object (and one block of generated
+JavaScript) per sensor. Large networks are clustered at low zoom and, once
+the map reports its viewport, only the sensors around the visible area are
+sent.
+
+The expensive part of a map (sensor arrays and serialized marker JSON) is
+cached by a fingerprint of ``sensor_locations``, so reruns that do not
+change the sensors only assemble the lightweight base map around it. An
+interpolated risk surface (see risk_surface) can be overlaid below the
+markers.
+"""
+import json
+import time
+
+import folium
+import numpy as np
+from branca.element import CssLink, Element, JavascriptLink
+from folium.plugins import FastMarkerCluster
+from folium.template import Template
+
+from cache import cached, frame_fingerprint
+from risk_engine import RISK_DTYPE, RISK_LEVELS
+from risk_surface import request_surface, surface_error, surface_pending
+from spatial_index import SensorIndex
+
+RISK_COLORS = {'High': 'red', 'Medium': 'orange', 'Low': 'green'}
+# Networks up to this size are drawn unclustered and without viewport filtering
+CLUSTER_MIN_SENSORS = 1000
+# Zoom level from which large networks are drawn as individual markers
+DISABLE_CLUSTERING_AT_ZOOM = 16
+# Fraction of the viewport size added on each side when filtering sensors
+VIEWPORT_PADDING = 0.5
+
+_MARKER_CALLBACK = """
+function (row) {
+    var colors = %s;
+    var levels = %s;
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 10, color: colors[row[3]], fill: true, fillColor: colors[row[3]], fillOpacity: 0.7
+    });
+    marker.bindPopup('Sensor: ' + row[2] + '<br>Risk: ' + levels[row[3]]);
+    return marker;
+}
+""" % ([RISK_COLORS[level] for level in RISK_LEVELS], RISK_LEVELS)
+
+LEGEND_HTML = '''
+<div style="position: fixed;
+            bottom: 50px; left: 50px; width: 160px; height: 110px;
+            background-color: rgba(255, 255, 255, 0.95);
+            border: 2px solid #333;
+            border-radius: 8px;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+            z-index: 9999;
+            font-size: 13px;
+            padding: 12px;
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;">
+<p style="margin: 0 0 8px 0; font-weight: bold; color: #333; border-bottom: 1px solid #ddd; padding-bottom: 4px;">Risk Levels</p>
+<p style="margin: 4px 0; color: #333;"><span style="display: inline-block; width: 12px; height: 12px; background-color: red; border-radius: 50%; margin-right: 8px;"></span>High Risk</p>
+<p style="margin: 4px 0; color: #333;"><span style="display: inline-block; width: 12px; height: 12px; background-color: orange; border-radius: 50%; margin-right: 8px;"></span>Medium Risk</p>
+<p style="margin: 4px 0; color: #333;"><span style="display: inline-block; width: 12px; height: 12px; background-color: green; border-radius: 50%; margin-right: 8px;"></span>Low Risk</p>
+</div>
+'''
+
+
+class _MarkerLayer(FastMarkerCluster):
+    """FastMarkerCluster taking its rows as an already serialized JSON array"""
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                {{ this.callback }}
+
+                var data = {{ this.data_json }};
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+
+                for (var i = 0; i < data.length; i++) {
+                    var row = data[i];
+                    var marker = callback(row);
+                    marker.addTo(cluster);
+                }
+
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, data_json, **kwargs):
+        super().__init__([], callback=_MARKER_CALLBACK, **kwargs)
+        self.data_json = data_json
+
+    def render(self, **kwargs):
+        # MacroElement.render would compile the script, marker data included, as a new template
+        figure = self.get_root()
+        for name, url in self.default_js:
+            figure.header.add_child(JavascriptLink(url), name=name)
+        for name, url in self.default_css:
+            figure.header.add_child(CssLink(url), name=name)
+        figure.script.add_child(_RawScript(self._template.module.script(self, kwargs)), name=self.get_name())
+
+
+class _RawScript(Element):
+    """Already rendered script, added to a figure without going through jinja again"""
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+
+    def render(self, **kwargs):
+        return self.script
+
+
+def _to_json(rows):
+    # Same escaping as jinja's tojson, so sensor ids cannot close the script tag
+    return json.dumps(rows).replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+
+
+class RiskMapData:
+    """Sensor arrays, map center and serialized markers of one sensor_locations frame"""
+
+    def __init__(self, sensor_locations):
+        latitude = sensor_locations['latitude'].to_numpy(dtype=np.float64)
+        longitude = sensor_locations['longitude'].to_numpy(dtype=np.float64)
+        risk = sensor_locations['risk_level'].astype(RISK_DTYPE).cat.codes.to_numpy()
+        located = ~(np.isnan(latitude) | np.isnan(longitude)) & (risk >= 0)
+
+        self.fingerprint = frame_fingerprint(sensor_locations)
+        self.n_sensors = len(sensor_locations)
+        self.latitude = latitude[located]
+        self.longitude = longitude[located]
+        # Modal risk level scaled to [0, 1], interpolated by the risk surface
+        self.scores = risk[located] / (len(RISK_LEVELS) - 1)
+        self.rows = list(zip(
+            np.round(self.latitude, 6).tolist(),
+            np.round(self.longitude, 6).tolist(),
+            sensor_locations['sensor_id'].astype(str).to_numpy()[located].tolist(),
+            risk[located].tolist(),
+        ))
+        self.rows_json = _to_json(self.rows)
+        # Positions in the index are positions in self.rows
+        self.index = SensorIndex.from_locations(sensor_locations[located])
+        self.center = [
+            float(self.latitude.mean()) if len(self.rows) else 0.0,
+            float(self.longitude.mean()) if len(self.rows) else 0.0,
+        ]
+
+    @property
+    def clustered(self):
+        """Whether the network is large enough to cluster and filter by viewport"""
+        return self.n_sensors > CLUSTER_MIN_SENSORS
+
+    def markers_json(self, bounds=None):
+        """Serialized marker rows, limited to the padded viewport for large networks"""
+        if not self.clustered or not bounds:
+            return self.rows_json
+        south, west = bounds['_southWest']['lat'], bounds['_southWest']['lng']
+        north, east = bounds['_northEast']['lat'], bounds['_northEast']['lng']
+        if None in (south, west, north, east):
+            return self.rows_json
+
+        pad_lat, pad_lon = (north - south) * VIEWPORT_PADDING, (east - west) * VIEWPORT_PADDING
+        inside = self.index.bbox(south - pad_lat, west - pad_lon, north + pad_lat, east + pad_lon)
+        return _to_json([self.rows[i] for i in inside])
+
+    def surface(self, zoom):
+        """Risk surface for the zoom level, or None while it is computed in the background"""
+        return request_surface(self.fingerprint, self.latitude, self.longitude, self.scores, zoom)
+
+    def surface_pending(self, zoom):
+        return surface_pending(self.fingerprint, zoom)
+
+    def surface_error(self, zoom):
+        return surface_error(self.fingerprint, zoom)
+
+
+@cached('risk_map', maxsize=8, key=lambda sensor_locations: frame_fingerprint(sensor_locations))
+def risk_map_data(sensor_locations):
+    """RiskMapData for sensor_locations, cached by its content"""
+    return RiskMapData(sensor_locations)
+
+
+def build_risk_map(data, bounds=None, surface=None, orthophoto=None, zoom_start=12):
+    """Base map with legend plus the sensor layer, for st_folium's feature_group_to_add
+
+    ``data`` is the RiskMapData from risk_map_data and ``bounds`` are the
+    map bounds last reported by st_folium. ``orthophoto`` is a ready
+    orthophoto.OrthophotoPyramid. The base map depends on none of them, so
+    panning or toggling overlays only swaps the sensor layer.
+    """
+    m = folium.Map(location=data.center, zoom_start=zoom_start, tiles='OpenStreetMap')
+    m.get_root().html.add_child(folium.Element(LEGEND_HTML))
+
+    sensors = folium.FeatureGroup(name='Sensors')
+    if orthophoto is not None:
+        metadata = orthophoto.metadata
+        south, west, north, east = metadata['bounds']
+        folium.TileLayer(
+            tiles=orthophoto.tile_url, attr='Orthophoto', name='Orthophoto', overlay=True,
+            min_zoom=0, max_zoom=22, min_native_zoom=metadata['min_zoom'], max_native_zoom=metadata['max_zoom'],
+            bounds=[[south, west], [north, east]]
+        ).add_to(sensors)
+    if surface is not None:
+        folium.raster_layers.ImageOverlay(surface.image, bounds=surface.image_bounds).add_to(sensors)
+    _MarkerLayer(
+        data.markers_json(bounds),
+        disableClusteringAtZoom=DISABLE_CLUSTERING_AT_ZOOM if data.clustered else 1,
+        chunkedLoading=True,
+        spiderfyOnMaxZoom=False,
+        showCoverageOnHover=False,
+    ).add_to(sensors)
+    return m, sensors
+
+
+def benchmark(sensor_counts=(1_000, 10_000, 50_000)):
+    """Time building and serializing the map on a cold and a warm cache"""
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    for n_sensors in sensor_counts:
+        sensor_locations = pd.DataFrame({
+            'sensor_id': [f'S{i:05d}' for i in range(n_sensors)],
+            'latitude': 30.7 + rng.random(n_sensors),
+            'longitude': 78.4 + rng.random(n_sensors),
+            'risk_level': pd.Categorical(rng.choice(RISK_LEVELS, n_sensors), dtype=RISK_DTYPE),
+        })
+        for label in ('cold', 'warm'):
+            start = time.perf_counter()
+            m, sensors = build_risk_map(risk_map_data(sensor_locations))
+            sensors.add_to(m)
+            m.get_root().render()
+            print(f"🗺️ {label} {n_sensors:>8,} sensors  {time.perf_counter() - start:8.3f}s")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield risk map benchmark")
+    benchmark()
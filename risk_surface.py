@@ -0,0 +1,180 @@
+"""
+Interpolated risk surface for the GeoShield risk maps
+
+Per-sensor risk scores are spread onto a raster grid by inverse distance
+weighting. Instead of evaluating every sensor at every grid cell, sensors
+are binned into the grid and the IDW numerator and denominator become two
+convolutions with a 1/d^p kernel, computed with FFTs, so the cost depends on
+the grid size rather than on the number of sensors.
+
+Surfaces are computed by a background worker and cached per data
+fingerprint and resolution (derived from the map zoom level); the app polls
+for them instead of blocking the script.
+"""
+import base64
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cache import CACHES, TTLCache
+from spatial_index import METERS_PER_DEGREE
+
+MAX_RESOLUTION = 1000
+IDW_POWER = 2.0
+# Extent added around the sensors on each side, as a fraction of their spread
+SURFACE_PADDING = 0.1
+SURFACE_OPACITY = 0.45
+# Low -> Medium -> High colors used by the app
+SURFACE_COLORS = np.array([[40, 167, 69], [253, 126, 20], [220, 53, 69]], dtype=np.float32)
+
+
+def resolution_for_zoom(zoom):
+    """Grid cells along the longer side of the surface at a map zoom level"""
+    return int(min(MAX_RESOLUTION, 128 * 2 ** max(0, int(zoom) - 10)))
+
+
+def surface_bounds(latitude, longitude, padding=SURFACE_PADDING):
+    """(south, west, north, east) around the sensors"""
+    pad_lat = max(np.ptp(latitude), 1e-3) * padding
+    pad_lon = max(np.ptp(longitude), 1e-3) * padding
+    return (float(latitude.min() - pad_lat), float(longitude.min() - pad_lon),
+            float(latitude.max() + pad_lat), float(longitude.max() + pad_lon))
+
+
+def idw_grid(latitude, longitude, values, bounds, shape, power=IDW_POWER):
+    """Inverse distance weighted interpolation of values onto a (rows, cols) grid
+
+    Row 0 is the northern edge. Sensors are snapped to grid cells, so the
+    result matches exact IDW up to half a cell of position error.
+    """
+    south, west, north, east = bounds
+    rows, cols = shape
+
+    row = np.clip(((north - latitude) / (north - south) * rows).astype(np.int64), 0, rows - 1)
+    col = np.clip(((longitude - west) / (east - west) * cols).astype(np.int64), 0, cols - 1)
+    cells = row * cols + col
+    weights = np.bincount(cells, minlength=rows * cols).reshape(rows, cols).astype(np.float64)
+    weighted = np.bincount(cells, weights=values, minlength=rows * cols).reshape(rows, cols)
+
+    # 1/d^p kernel over every offset between two cells, in wrap-around order so a
+    # circular convolution of size (2 rows, 2 cols) equals the linear one
+    cell_h = (north - south) / rows * METERS_PER_DEGREE
+    cell_w = (east - west) / cols * METERS_PER_DEGREE * np.cos(np.radians((north + south) / 2))
+    dy = np.fft.fftfreq(2 * rows, 1 / (2 * rows)) * cell_h
+    dx = np.fft.fftfreq(2 * cols, 1 / (2 * cols)) * cell_w
+    distance = np.sqrt(dy[:, None] ** 2 + dx[None, :] ** 2)
+    kernel = 1.0 / (distance ** power + (min(cell_h, cell_w) / 2) ** power)
+
+    size = (2 * rows, 2 * cols)
+    kernel_fft = np.fft.rfft2(kernel)
+    numerator = np.fft.irfft2(np.fft.rfft2(weighted, size) * kernel_fft, size)[:rows, :cols]
+    denominator = np.fft.irfft2(np.fft.rfft2(weights, size) * kernel_fft, size)[:rows, :cols]
+    return numerator / np.maximum(denominator, np.finfo(np.float64).tiny)
+
+
+def surface_image(scores, opacity=SURFACE_OPACITY):
+    """PNG data URL coloring scores in [0, 1] from Low to High risk colors"""
+    from PIL import Image
+
+    position = np.clip(np.nan_to_num(scores), 0, 1) * (len(SURFACE_COLORS) - 1)
+    lower = np.minimum(position.astype(np.int64), len(SURFACE_COLORS) - 2)
+    fraction = (position - lower)[..., None].astype(np.float32)
+    rgb = SURFACE_COLORS[lower] * (1 - fraction) + SURFACE_COLORS[lower + 1] * fraction
+    alpha = np.full(scores.shape + (1,), round(255 * opacity), dtype=np.float32)
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.concatenate([rgb, alpha], axis=-1).astype(np.uint8), 'RGBA').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+class RiskSurface:
+    """Rendered risk surface: PNG image and its geographic bounds"""
+
+    def __init__(self, latitude, longitude, scores, resolution):
+        start = time.perf_counter()
+        self.bounds = surface_bounds(latitude, longitude)
+        south, west, north, east = self.bounds
+        aspect = (east - west) * np.cos(np.radians((north + south) / 2)) / (north - south)
+        self.shape = (
+            max(1, round(resolution / max(aspect, 1))),
+            max(1, round(resolution * min(aspect, 1)))
+        )
+        self.grid = idw_grid(latitude, longitude, scores, self.bounds, self.shape)
+        self.image = surface_image(self.grid)
+        self.elapsed = time.perf_counter() - start
+
+    @property
+    def image_bounds(self):
+        """[[south, west], [north, east]] as expected by folium's ImageOverlay"""
+        south, west, north, east = self.bounds
+        return [[south, west], [north, east]]
+
+
+SURFACE_CACHE = CACHES.get('risk_surface') or TTLCache('risk_surface', maxsize=16, ttl=3600)
+# One worker keeps surface computation from competing with the app for the CPU
+SURFACE_WORKER = ThreadPoolExecutor(max_workers=1, thread_name_prefix='geoshield-surface')
+_pending = {}
+# Computation errors by cache key; a failed surface is not queued again
+_failed = {}
+_pending_lock = threading.Lock()
+
+
+def request_surface(key, latitude, longitude, scores, zoom):
+    """Cached surface for ``key`` at the zoom level's resolution, or None while it is computed
+
+    ``key`` identifies the sensor data (e.g. its fingerprint). The first
+    request for a key and resolution queues the computation on the
+    background worker. A failed computation is recorded (see surface_error)
+    instead of being retried.
+    """
+    cache_key = (key, resolution_for_zoom(zoom))
+    surface = SURFACE_CACHE.get(cache_key)
+    if surface is not None or len(scores) == 0:
+        return surface
+
+    def compute():
+        try:
+            SURFACE_CACHE.set(cache_key, RiskSurface(latitude, longitude, scores, cache_key[1]))
+        except Exception as e:
+            with _pending_lock:
+                _failed[cache_key] = str(e) or type(e).__name__
+        finally:
+            with _pending_lock:
+                _pending.pop(cache_key, None)
+
+    with _pending_lock:
+        if cache_key not in _pending and cache_key not in _failed:
+            _pending[cache_key] = SURFACE_WORKER.submit(compute)
+    return None
+
+
+def surface_pending(key, zoom):
+    """Whether a surface for ``key`` at this zoom level is still being computed"""
+    with _pending_lock:
+        return (key, resolution_for_zoom(zoom)) in _pending
+
+
+def surface_error(key, zoom):
+    """Error message if the surface for ``key`` at this zoom level failed, else None"""
+    with _pending_lock:
+        return _failed.get((key, resolution_for_zoom(zoom)))
+
+
+def benchmark(sensor_counts=(1_000, 5_000, 20_000), resolution=MAX_RESOLUTION):
+    """Time risk surfaces for synthetic networks at full resolution"""
+    rng = np.random.default_rng(0)
+    for n_sensors in sensor_counts:
+        latitude = 30.7 + rng.random(n_sensors) * 0.1
+        longitude = 78.4 + rng.random(n_sensors) * 0.1
+        scores = rng.integers(0, 3, n_sensors) / 2
+
+        surface = RiskSurface(latitude, longitude, scores, resolution)
+        print(f"🌡️ {n_sensors:>8,} sensors  {surface.shape[0]}x{surface.shape[1]} grid  {surface.elapsed:8.3f}s")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield risk surface benchmark")
+    benchmark()
@@ -0,0 +1,218 @@
+"""
+Per-sensor time-window rollups (hourly, daily, weekly) for analytics charts
+
+A rollup row summarizes one sensor over one time bucket: min, max, sum,
+count and last value of every measurement plus the number of readings at
+each risk level. Hourly rollups are built from the readings; daily and
+weekly ones are derived from the hourly rollups, and rollups of separate
+chunks merge exactly, so new data can be folded in without touching the
+history. Charts pick the coarsest resolution that still gives enough points
+for the requested time range.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import MEASUREMENT_COLUMNS
+from risk_engine import RISK_DTYPE, RISK_LEVELS
+
+_HOUR = 3600 * 10**9
+# Bucket width and offset from the epoch in ns; weeks start on Monday (the epoch was a Thursday)
+RESOLUTIONS = {
+    'hour': (_HOUR, 0),
+    'day': (24 * _HOUR, 0),
+    'week': (7 * 24 * _HOUR, 4 * 24 * _HOUR),
+}
+RESOLUTION_LABELS = {'raw': 'Raw readings', 'hour': 'Hourly', 'day': 'Daily', 'week': 'Weekly'}
+# Points a chart should show at most when the resolution is chosen automatically
+MAX_CHART_POINTS = 500
+RISK_COUNT_COLUMNS = [f'{level.lower()}_risk' for level in RISK_LEVELS]
+
+
+def bucket_start(timestamps, resolution):
+    """Start of the resolution bucket containing each timestamp (int64 ns)"""
+    width, offset = RESOLUTIONS[resolution]
+    return (timestamps - offset) // width * width + offset
+
+
+def rollup(df, resolution='hour'):
+    """Rollup rows of readings, one per (sensor, bucket), sorted by sensor and time"""
+    columns = [col for col in MEASUREMENT_COLUMNS if col in df.columns]
+    timestamps = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    sensors = pd.Categorical(df['sensor_id'])
+    keys = [pd.Series(sensors.codes, name='sensor'), pd.Series(bucket_start(timestamps, resolution), name='bucket')]
+
+    values = df[columns].reset_index(drop=True)
+    grouped = values.groupby(keys, sort=True)
+    stats = grouped.agg(['min', 'max', 'sum', 'count'])
+    stats.columns = [f'{col}_{stat}' for col, stat in stats.columns]
+    stats['count'] = grouped.size()
+
+    # Last value = value at each bucket's latest reading
+    last_time = pd.Series(timestamps).groupby(keys, sort=True).idxmax()
+    latest = values.iloc[last_time.to_numpy()]
+    for col in columns:
+        stats[f'{col}_last'] = latest[col].to_numpy()
+    stats['last_time'] = timestamps[last_time.to_numpy()]
+
+    group_ids = grouped.ngroup().to_numpy()
+    n_levels = len(RISK_LEVELS)
+    if 'risk_level' in df.columns:
+        risk = pd.Categorical(df['risk_level'], dtype=RISK_DTYPE).codes.astype(np.int64)
+        valid = risk >= 0
+        counts = np.bincount(group_ids[valid] * n_levels + risk[valid], minlength=len(stats) * n_levels)
+    else:
+        counts = np.zeros(len(stats) * n_levels, dtype=np.int64)
+    for i, col in enumerate(RISK_COUNT_COLUMNS):
+        stats[col] = counts.reshape(-1, n_levels)[:, i]
+
+    return _finish(stats, sensors.categories)
+
+
+def _finish(stats, categories):
+    sensor_codes = stats.index.get_level_values(0).to_numpy()
+    buckets = stats.index.get_level_values(1).to_numpy()
+    stats = stats.reset_index(drop=True)
+    stats.insert(0, 'sensor_id', pd.Categorical.from_codes(sensor_codes, categories=categories))
+    stats.insert(1, 'timestamp', buckets.astype('datetime64[ns]'))
+    return stats
+
+
+def _combine(frames, resolution):
+    """Merge rollup rows falling into the same (sensor, bucket) of ``resolution``"""
+    frames = [frame for frame in frames if len(frame) > 0]
+    if not frames:
+        return None
+    categories = pd.api.types.union_categoricals([frame['sensor_id'] for frame in frames], ignore_order=True).categories
+    combined = pd.concat(
+        [frame.assign(sensor_id=frame['sensor_id'].cat.set_categories(categories)) for frame in frames],
+        ignore_index=True
+    )
+    timestamps = combined['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    keys = [
+        pd.Series(combined['sensor_id'].cat.codes.to_numpy(), name='sensor'),
+        pd.Series(bucket_start(timestamps, resolution), name='bucket')
+    ]
+
+    aggregations = {}
+    for col in combined.columns:
+        if col.endswith('_min'):
+            aggregations[col] = 'min'
+        elif col.endswith('_max'):
+            aggregations[col] = 'max'
+        elif col.endswith(('_sum', '_count')) or col in ['count'] + RISK_COUNT_COLUMNS:
+            aggregations[col] = 'sum'
+    merged = combined.groupby(keys, sort=True).agg(aggregations)
+
+    # Last values come from the row with the latest reading
+    latest = combined['last_time'].groupby(keys, sort=True).idxmax().to_numpy()
+    for col in combined.columns:
+        if col.endswith('_last') or col == 'last_time':
+            merged[col] = combined[col].to_numpy()[latest]
+
+    return _finish(merged[[col for col in combined.columns if col in merged.columns]], categories)
+
+
+def coarsen(rollups, resolution):
+    """Rollups at a coarser resolution (e.g. hourly -> daily)"""
+    return _combine([rollups], resolution)
+
+
+def merge_rollups(frames, resolution):
+    """Merge rollups of the same resolution built from separate chunks of readings"""
+    return _combine(frames, resolution)
+
+
+def summarize(rows, column):
+    """Count, mean, min and max of a measurement over rollup rows (exact, like describe())"""
+    count = rows[f'{column}_count'].sum()
+    return pd.Series({
+        'count': count,
+        'mean': rows[f'{column}_sum'].sum() / count if count else np.nan,
+        'min': rows[f'{column}_min'].min(),
+        'max': rows[f'{column}_max'].max(),
+    }, name=column)
+
+
+class SensorRollups:
+    """Hourly, daily and weekly rollups of a set of readings"""
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    @classmethod
+    def from_frame(cls, df):
+        hourly = rollup(df, 'hour')
+        daily = coarsen(hourly, 'day')
+        return cls({'hour': hourly, 'day': daily, 'week': coarsen(daily, 'week')})
+
+    def update(self, df):
+        """Fold new readings into every resolution"""
+        new = SensorRollups.from_frame(df)
+        self.levels = {
+            resolution: merge_rollups([self.levels[resolution], new.levels[resolution]], resolution)
+            for resolution in RESOLUTIONS
+        }
+        return self
+
+    def readings(self, sensors=None, start=None, end=None):
+        """Number of raw readings in a range (from the hourly counts)"""
+        return int(self.query('hour', sensors, start, end)['count'].sum())
+
+    def choose_resolution(self, sensors=None, start=None, end=None, max_points=MAX_CHART_POINTS):
+        """Finest resolution ('raw', 'hour', 'day' or 'week') with at most max_points per sensor"""
+        n_sensors = max(1, len(sensors)) if sensors is not None else max(1, self.levels['hour']['sensor_id'].nunique())
+        if self.readings(sensors, start, end) <= max_points * n_sensors:
+            return 'raw'
+        for resolution in RESOLUTIONS:
+            if len(self.query(resolution, sensors, start, end)) <= max_points * n_sensors:
+                return resolution
+        return 'week'
+
+    def query(self, resolution, sensors=None, start=None, end=None):
+        """Rollup rows at one resolution, with a <col>_mean column per measurement"""
+        rows = self.levels[resolution]
+        mask = np.ones(len(rows), dtype=bool)
+        if sensors is not None:
+            mask &= rows['sensor_id'].astype(str).isin([str(s) for s in sensors]).to_numpy()
+        if start is not None:
+            first = bucket_start(pd.Timestamp(start).as_unit('ns').value, resolution)
+            mask &= rows['timestamp'].to_numpy() >= np.datetime64(first, 'ns')
+        if end is not None:
+            mask &= rows['timestamp'].to_numpy() <= pd.Timestamp(end).to_datetime64()
+
+        rows = rows[mask].reset_index(drop=True)
+        for col in MEASUREMENT_COLUMNS:
+            if f'{col}_sum' in rows.columns:
+                rows[f'{col}_mean'] = rows[f'{col}_sum'] / rows[f'{col}_count'].where(rows[f'{col}_count'] > 0)
+        return rows
+
+    def risk_trend(self, resolution='day', start=None, end=None):
+        """Readings per risk level and bucket, summed over all sensors"""
+        rows = self.query(resolution, start=start, end=end)
+        return rows.groupby('timestamp', sort=True)[RISK_COUNT_COLUMNS].sum().reset_index()
+
+
+def benchmark(n_sensors=10, days=365):
+    """One year of 1-minute readings: rollup build time and points per chart"""
+    from sample_data import SensorNetwork
+    from risk_engine import classify_risk
+
+    df = SensorNetwork(n_sensors=n_sensors, days=days, interval_minutes=1).frame()
+    df['risk_level'] = classify_risk(df)
+
+    start = time.perf_counter()
+    rollups = SensorRollups.from_frame(df)
+    print(f"🏗️ rollups of {len(df):>12,} rows  {time.perf_counter() - start:8.3f}s")
+
+    sensor = [str(df['sensor_id'].iloc[0])]
+    resolution = rollups.choose_resolution(sensor)
+    start = time.perf_counter()
+    points = rollups.query(resolution, sensor)
+    print(f"📈 1 year chart: {resolution} resolution, {len(points):,} points  {time.perf_counter() - start:8.3f}s")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield rollup benchmark")
+    benchmark()
@@ -1,12 +1,24 @@
 """
 Generate data files for the GeoShield system
 """
+import argparse
+import time
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 import os
 
+# Default monitoring site location
+SITE_LATITUDE = 24.1711917
+SITE_LONGITUDE = 82.6588845
+
+# Decimal places written to CSV for each column
+CSV_DECIMALS = {
+    'displacement_mm': 2, 'pore_pressure_kpa': 2, 'strain_micro': 2,
+    'vibration_ms2': 3, 'rainfall_mm': 1, 'latitude': 6, 'longitude': 6
+}
+
 def create_sample_orthophoto():
     """Create a sample orthophoto image for demonstration"""
     
@@ -55,45 +67,116 @@ def create_sample_orthophoto():
     img.save('sample_orthophoto.jpg', 'JPEG', quality=85)
     print("✅ Orthophoto created: sample_orthophoto.jpg")
 
+class SensorNetwork:
+    """Bulk generator of synthetic sensor readings
+
+    Readings are laid out sensor-major (all timestamps of sensor 1, then
+    sensor 2, ...), so any row range can be generated independently and
+    deterministically from ``seed``. Every column is produced with NumPy
+    array operations; there is no per-row Python code.
+    """
+
+    def __init__(self, n_sensors=15, days=30, interval_minutes=24 * 60, high_risk_fraction=0.2,
+                 seed=42, end=None, latitude=SITE_LATITUDE, longitude=SITE_LONGITUDE, spread_deg=0.005):
+        self.n_sensors = n_sensors
+        self.interval = np.timedelta64(int(interval_minutes * 60), 's')
+        self.n_times = max(1, int(days * 24 * 60 // interval_minutes))
+        self.n_rows = self.n_sensors * self.n_times
+        self.seed = seed
+
+        end = np.datetime64(end or datetime.now(), 's')
+        self.start = end - (self.n_times - 1) * self.interval
+
+        # Per-sensor attributes are fixed for the whole run
+        rng = np.random.default_rng([seed, 0])
+        width = max(3, len(str(n_sensors)))
+        self.sensor_ids = pd.Index([f'S{i:0{width}d}' for i in range(1, n_sensors + 1)])
+        self.latitude = latitude + rng.normal(0, spread_deg, n_sensors)
+        self.longitude = longitude + rng.normal(0, spread_deg, n_sensors)
+        self.high_risk = rng.random(n_sensors) < high_risk_fraction
+
+    def rows(self, begin, end):
+        """Generate readings for row positions [begin, end)"""
+        n = end - begin
+        rng = np.random.default_rng([self.seed, 1, begin])
+        position = np.arange(begin, end, dtype=np.int64)
+        sensor = position // self.n_times
+        step = position - sensor * self.n_times
+
+        normal = lambda loc, scale: rng.standard_normal(n, dtype=np.float32) * np.float32(scale) + np.float32(loc)
+
+        # Generate realistic sensor data with some correlation
+        base_displacement = normal(5, 2)
+        rainfall = np.maximum(normal(20, 15), 0)
+        displacement = np.maximum(base_displacement + rainfall * np.float32(0.1) + normal(0, 1), 0)
+
+        # Some sensors should have higher risk readings
+        high_risk = self.high_risk[sensor]
+        displacement += np.where(high_risk, normal(5, 2), np.float32(0))
+        rainfall += np.where(high_risk, normal(10, 5), np.float32(0))
+
+        return pd.DataFrame({
+            'sensor_id': pd.Categorical.from_codes(sensor, categories=self.sensor_ids),
+            'timestamp': self.start + step * self.interval,
+            'displacement_mm': np.maximum(displacement, 0),
+            'pore_pressure_kpa': normal(150, 30),
+            'strain_micro': normal(100, 25),
+            'vibration_ms2': rng.exponential(2, n).astype(np.float32),
+            'rainfall_mm': np.maximum(rainfall, 0),
+            'latitude': self.latitude[sensor].astype(np.float32),
+            'longitude': self.longitude[sensor].astype(np.float32)
+        })
+
+    def frame(self):
+        """All readings as a single DataFrame"""
+        return self.rows(0, self.n_rows)
+
+    def chunks(self, chunk_rows=1_000_000):
+        """Yield the readings in DataFrames of at most chunk_rows rows"""
+        for begin in range(0, self.n_rows, chunk_rows):
+            yield self.rows(begin, min(begin + chunk_rows, self.n_rows))
+
+    def write(self, path, chunk_rows=1_000_000):
+        """Stream the readings to a .parquet or .csv file without holding them all in memory"""
+        is_parquet = str(path).endswith('.parquet')
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+            import pyarrow.parquet as pq
+        except ImportError:
+            if is_parquet:
+                raise
+            # pandas fallback for CSV when pyarrow is not installed
+            for i, chunk in enumerate(self.chunks(chunk_rows)):
+                chunk.round(CSV_DECIMALS).to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            return self.n_rows
+
+        writer = None
+        try:
+            for chunk in self.chunks(chunk_rows):
+                if is_parquet:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                else:
+                    chunk = chunk.round(CSV_DECIMALS).astype({'sensor_id': str})
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema) if is_parquet else pacsv.CSVWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return self.n_rows
+
+
 def create_sample_csv():
     """Create sample sensor data CSV"""
     
     # Generate realistic sensor data
-    np.random.seed(42)
     n_sensors = 15
     n_days = 30
     
-    data = []
-    for sensor_id in range(1, n_sensors + 1):
-        for day in range(n_days):
-            timestamp = datetime.now() - timedelta(days=day, hours=np.random.randint(0, 24))
-            
-            # Generate realistic sensor data with some correlation
-            base_displacement = np.random.normal(5, 2)
-            base_rainfall = max(0, np.random.normal(20, 15))
-            
-            # Create some correlation between displacement and rainfall
-            displacement = max(0, base_displacement + base_rainfall * 0.1 + np.random.normal(0, 1))
-            
-            # Some sensors should have higher risk readings
-            if sensor_id in [1, 4, 9]:  # High risk sensors
-                displacement += np.random.normal(5, 2)
-                base_rainfall += np.random.normal(10, 5)
-            
-            data.append({
-                'sensor_id': f'S{sensor_id:03d}',
-                'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'displacement_mm': round(max(0, displacement), 2),
-                'pore_pressure_kpa': round(np.random.normal(150, 30), 2),
-                'strain_micro': round(np.random.normal(100, 25), 2),
-                'vibration_ms2': round(np.random.exponential(2), 3),
-                'rainfall_mm': round(max(0, base_rainfall), 1),
-                'latitude': round(24.1711917 + np.random.normal(0, 0.005), 6),
-                'longitude': round(82.6588845 + np.random.normal(0, 0.005), 6)
-            })
-    
-    df = pd.DataFrame(data)
-    df = df.sort_values(['sensor_id', 'timestamp'])
+    df = SensorNetwork(n_sensors=n_sensors, days=n_days, high_risk_fraction=0.2).frame()
+    df = df.round(CSV_DECIMALS)
     
     # Save CSV
     df.to_csv('sample_sensor_data.csv', index=False)
@@ -102,7 +185,36 @@ def create_sample_csv():
     
     return df
 
+def create_load_test_data(path, n_sensors, days, interval_minutes, high_risk_fraction, seed, chunk_rows):
+    """Stream a large synthetic dataset to disk and report throughput"""
+    network = SensorNetwork(
+        n_sensors=n_sensors, days=days, interval_minutes=interval_minutes,
+        high_risk_fraction=high_risk_fraction, seed=seed
+    )
+    print(f"🏭 Generating {network.n_rows:,} readings for {n_sensors:,} sensors over {days} days...")
+    
+    start = time.perf_counter()
+    rows = network.write(path, chunk_rows=chunk_rows)
+    elapsed = time.perf_counter() - start
+    
+    print(f"✅ Wrote {rows:,} rows to {path} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate GeoShield sample or load-test data")
+    parser.add_argument('--out', help="Write a load-test dataset to this .parquet or .csv file")
+    parser.add_argument('--sensors', type=int, default=1000, help="Number of sensors")
+    parser.add_argument('--days', type=float, default=365, help="Duration in days")
+    parser.add_argument('--interval', type=float, default=60, help="Sampling interval in minutes")
+    parser.add_argument('--high-risk-fraction', type=float, default=0.2, help="Fraction of high-risk sensors")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000, help="Rows generated per chunk")
+    args = parser.parse_args()
+    
+    if args.out:
+        create_load_test_data(args.out, args.sensors, args.days, args.interval,
+                              args.high_risk_fraction, args.seed, args.chunk_rows)
+        raise SystemExit(0)
+    
     print("🏔️ Creating sample data for GeoShield demo...")
     
     # Create sample files
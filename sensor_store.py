@@ -0,0 +1,176 @@
+"""
+Persistent columnar (Parquet) store for processed sensor data
+
+Readings are stored as a hive-partitioned Parquet dataset:
+
+    <store>/upload_id=<upload>/site_id=<site>/sensor_id=<sensor>/date=<YYYY-MM-DD>/part-0.parquet
+
+so reads only open the partitions matching the requested upload, sites,
+sensors and days, and only decode the requested columns. Every upload is
+kept whole under its own id, so uploads that share sensors and days never
+replace each other's readings; reads default to the most recent upload and
+only the last KEEP_UPLOADS uploads are retained. Requires the optional
+pyarrow dependency.
+"""
+import json
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+from cache import cached
+from ingest import COORDINATE_COLUMNS, MEASUREMENT_COLUMNS, compact_readings
+
+STORE_DIR = os.environ.get(
+    'GEOSHIELD_STORE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sensor_store')
+)
+DEFAULT_SITE = 'default'
+PARTITION_COLUMNS = ['upload_id', 'site_id', 'sensor_id', 'date']
+KEEP_UPLOADS = 8
+# Columns of the readings as ingested; rolling features and risk levels are derived from them
+READING_COLUMNS = ['sensor_id', 'site_id', 'timestamp', *MEASUREMENT_COLUMNS, *COORDINATE_COLUMNS]
+# Upload ids, oldest first (a leading underscore keeps it out of dataset discovery)
+MANIFEST = '_uploads.json'
+
+_manifest_lock = threading.Lock()
+
+
+def store_available():
+    """Whether the optional pyarrow dependency for the store is installed"""
+    try:
+        import pyarrow.dataset  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(
+        pa.schema([
+            ('upload_id', pa.string()),
+            ('site_id', pa.string()),
+            ('sensor_id', pa.string()),
+            ('date', pa.date32()),
+        ]),
+        flavor='hive'
+    )
+
+
+def uploads(store_dir=None):
+    """Ids of the retained uploads, oldest first"""
+    try:
+        with open(os.path.join(store_dir or STORE_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def latest_upload(store_dir=None):
+    """Id of the most recent upload, or None for an empty store"""
+    ids = uploads(store_dir)
+    return ids[-1] if ids else None
+
+
+def write_sensor_data(df, upload_id, store_dir=None):
+    """Write processed readings as upload ``upload_id`` (replacing an earlier write of the same id)"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    store_dir = store_dir or STORE_DIR
+    table_df = df.assign(
+        upload_id=str(upload_id),
+        site_id=df['site_id'].astype(str) if 'site_id' in df.columns else DEFAULT_SITE,
+        sensor_id=df['sensor_id'].astype(str),
+        date=pd.to_datetime(df['timestamp']).dt.date,
+    )
+    table = pa.Table.from_pandas(table_df, preserve_index=False)
+
+    ds.write_dataset(
+        table,
+        store_dir,
+        format='parquet',
+        partitioning=_partitioning(),
+        basename_template='part-{i}.parquet',
+        existing_data_behavior='delete_matching',
+        max_partitions=1 << 20,
+    )
+    _record_upload(str(upload_id), store_dir)
+    read_sensor_data.invalidate()
+    return len(table)
+
+
+def _record_upload(upload_id, store_dir):
+    """Make upload_id the latest upload and drop uploads beyond KEEP_UPLOADS"""
+    with _manifest_lock:
+        ids = [existing for existing in uploads(store_dir) if existing != upload_id] + [upload_id]
+        for expired in ids[:-KEEP_UPLOADS]:
+            shutil.rmtree(os.path.join(store_dir, f'upload_id={expired}'), ignore_errors=True)
+        ids = ids[-KEEP_UPLOADS:]
+        path = os.path.join(store_dir, MANIFEST)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(ids, f)
+        os.replace(path + '.tmp', path)
+
+
+def has_data(store_dir=None):
+    """Whether any upload has been written to the store yet"""
+    return latest_upload(store_dir) is not None
+
+
+def _read_key(columns=None, sensors=None, start=None, end=None, sites=None, upload_id=None, store_dir=None):
+    as_key = lambda values: None if values is None else tuple(str(v) for v in values)
+    return (as_key(columns), as_key(sensors), str(start), str(end), as_key(sites), upload_id, store_dir or STORE_DIR)
+
+
+@cached('sensor_store', maxsize=16, ttl=600, key=_read_key)
+def read_sensor_data(columns=None, sensors=None, start=None, end=None, sites=None, upload_id=None, store_dir=None):
+    """Read readings of one upload with column projection and partition/predicate pushdown
+
+    ``upload_id`` defaults to the most recent upload. ``start`` and ``end``
+    bound ``timestamp`` (inclusive); day partitions outside the range are
+    skipped without being opened. Results are cached until the store is
+    written to; callers must not mutate them.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    store_dir = store_dir or STORE_DIR
+    upload_id = upload_id or latest_upload(store_dir)
+    dataset = ds.dataset(store_dir, format='parquet', partitioning=_partitioning())
+
+    predicate = ds.field('upload_id') == str(upload_id)
+
+    def add(condition):
+        nonlocal predicate
+        predicate = predicate & condition
+
+    if sites is not None:
+        add(ds.field('site_id').isin([str(s) for s in sites]))
+    if sensors is not None:
+        add(ds.field('sensor_id').isin([str(s) for s in sensors]))
+    if start is not None:
+        start = pd.Timestamp(start)
+        add(ds.field('date') >= pa.scalar(start.date(), pa.date32()))
+        add(ds.field('timestamp') >= pa.scalar(start.to_datetime64()))
+    if end is not None:
+        end = pd.Timestamp(end)
+        add(ds.field('date') <= pa.scalar(end.date(), pa.date32()))
+        add(ds.field('timestamp') <= pa.scalar(end.to_datetime64()))
+
+    if columns is None:
+        # The upload is fixed and the day partition key only mirrors timestamp
+        columns = ['sensor_id'] + [col for col in dataset.schema.names if col not in ('sensor_id', 'date', 'upload_id')]
+    else:
+        columns = [col for col in columns if col in dataset.schema.names]
+
+    df = dataset.to_table(columns=columns, filter=predicate).to_pandas()
+
+    df = compact_readings(df)
+    if 'timestamp' in df.columns:
+        df = df.sort_values(['sensor_id', 'timestamp'] if 'sensor_id' in df.columns else 'timestamp', ignore_index=True)
+    return df
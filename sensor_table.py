@@ -0,0 +1,143 @@
+"""
+Readings sorted by (sensor_id, timestamp) with a per-sensor offset index
+
+Once the processed readings are sorted by sensor and time, each sensor's
+readings are one contiguous block of rows. The table keeps the start offset
+of every block, so selecting a sensor is a slice rather than a boolean scan
+over the whole frame, and a time range within a sensor is two binary
+searches over its timestamps.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def sensor_codes(sensor_id):
+    """Codes of a sensor_id column in sorted id order, and the sorted ids as strings"""
+    if isinstance(sensor_id.dtype, pd.CategoricalDtype):
+        # Factorize the few categories instead of every row
+        names = sensor_id.cat.categories.astype(str)
+        present = np.bincount(sensor_id.cat.codes[sensor_id.cat.codes >= 0], minlength=len(names)) > 0
+        order = np.argsort(names.to_numpy()[present], kind='stable')
+        rank = np.full(len(names) + 1, -1, dtype=np.int64)
+        rank[np.flatnonzero(present)[order]] = np.arange(len(order))
+        return rank[sensor_id.cat.codes.to_numpy()], names[present][order]
+    return pd.factorize(sensor_id.astype(str), sort=True)
+
+
+def sort_order(codes, timestamps):
+    """Positions sorting rows by (code, timestamp), or None if they already are"""
+    step_codes, step_times = np.diff(codes), np.diff(timestamps)
+    if np.all((step_codes > 0) | ((step_codes == 0) & (step_times >= 0))):
+        return None
+    # Stable sort by time, then a stable (radix, for small ints) sort by sensor
+    order = np.argsort(timestamps, kind='stable')
+    small = np.int16 if codes.max(initial=0) < np.iinfo(np.int16).max else np.int64
+    return order[np.argsort(codes[order].astype(small), kind='stable')]
+
+
+def sort_readings(df):
+    """df sorted by (sensor_id, timestamp), returned as is when it already is"""
+    codes, _ = sensor_codes(df['sensor_id'])
+    order = sort_order(codes, _timestamps(df))
+    return df if order is None else df.take(order).reset_index(drop=True)
+
+
+def _timestamps(df):
+    return pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+class SensorTable:
+    """Read-only query API over readings sorted by (sensor_id, timestamp)"""
+
+    def __init__(self, df):
+        codes, uniques = sensor_codes(df['sensor_id'])
+        order = sort_order(codes, _timestamps(df))
+        if order is not None:
+            df, codes = df.take(order).reset_index(drop=True), codes[order]
+        self.df = df
+        self.sensor_ids = list(uniques)
+        self._positions = {sensor_id: i for i, sensor_id in enumerate(self.sensor_ids)}
+        # Rows offsets[i]:offsets[i + 1] belong to sensor_ids[i]; rows without a sensor id sort first
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self.offsets = int((codes < 0).sum()) + np.concatenate([[0], np.cumsum(counts)])
+        self.timestamps = self.df['timestamp'].to_numpy(dtype='datetime64[ns]')
+
+    def __len__(self):
+        return len(self.df)
+
+    def __contains__(self, sensor_id):
+        return str(sensor_id) in self._positions
+
+    def bounds(self, sensor_id, start=None, end=None):
+        """(first, stop) row positions of a sensor's readings between start and end (inclusive)"""
+        position = self._positions.get(str(sensor_id))
+        if position is None:
+            return 0, 0
+        first, stop = int(self.offsets[position]), int(self.offsets[position + 1])
+        block = self.timestamps[first:stop]
+        if start is not None:
+            first += int(np.searchsorted(block, pd.Timestamp(start).to_datetime64(), side='left'))
+        if end is not None:
+            stop = first + int(np.searchsorted(self.timestamps[first:stop], pd.Timestamp(end).to_datetime64(), side='right'))
+        return first, stop
+
+    def positions(self, sensors=None, start=None, end=None):
+        """Row positions of the readings of ``sensors`` (default: all) between start and end"""
+        sensors = self.sensor_ids if sensors is None else sensors
+        ranges = [self.bounds(sensor_id, start, end) for sensor_id in sensors]
+        ranges = [(first, stop) for first, stop in ranges if stop > first]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(first, stop) for first, stop in ranges])
+
+    def sensor(self, sensor_id, columns=None):
+        """All readings of one sensor, in time order"""
+        first, stop = self.bounds(sensor_id)
+        rows = self.df.iloc[first:stop]
+        return rows if columns is None else rows[columns]
+
+    def query(self, sensors=None, start=None, end=None, columns=None):
+        """Readings of ``sensors`` between start and end, sorted by sensor and time"""
+        if sensors is None and start is None and end is None:
+            rows = self.df
+        elif sensors is not None and len(sensors) == 1:
+            rows = self.df.iloc[slice(*self.bounds(sensors[0], start, end))]
+        else:
+            rows = self.df.iloc[self.positions(sensors, start, end)]
+        return rows if columns is None else rows[columns]
+
+    def latest(self, columns=None):
+        """Most recent reading of every sensor"""
+        rows = self.df.iloc[self.offsets[1:] - 1] if len(self.df) else self.df
+        return rows if columns is None else rows[columns]
+
+
+def benchmark(n_sensors=100, days=365, n_queries=1_000):
+    """Index build and per-sensor query time against a boolean filter"""
+    from sample_data import SensorNetwork
+
+    df = SensorNetwork(n_sensors=n_sensors, days=days, interval_minutes=10).frame()
+    shuffled = df.sample(frac=1, random_state=0)
+    start = time.perf_counter()
+    table = SensorTable(shuffled)
+    print(f"🏗️ sort + index {len(df):>12,} rows  {time.perf_counter() - start:8.3f}s")
+
+    sensor_ids = np.random.default_rng(0).choice(table.sensor_ids, n_queries)
+    week_start, week_end = df['timestamp'].max() - pd.Timedelta(days=7), df['timestamp'].max()
+    for label, query in (
+        ('filter + sort', lambda s: df[df['sensor_id'] == s].sort_values('timestamp')),
+        ('sensor slice', lambda s: table.sensor(s)),
+        ('sensor week', lambda s: table.query([s], week_start, week_end)),
+    ):
+        count = n_queries if label != 'filter + sort' else 20
+        start = time.perf_counter()
+        for sensor_id in sensor_ids[:count]:
+            query(sensor_id)
+        print(f"🔍 {label:<14} per query  {(time.perf_counter() - start) / count * 1000:8.3f}ms")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield sensor table benchmark")
+    benchmark()
@@ -0,0 +1,221 @@
+"""
+Grid spatial index for sensor locations
+
+Sensors are bucketed into a fixed global latitude/longitude grid and kept
+sorted by cell key, so a bounding box becomes one binary-searched key range
+per grid row instead of a scan over every sensor. Radius and k-nearest
+queries search the cells around the query point and refine with haversine
+distances. Sensors can be added (or moved) incrementally without rebuilding.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6_371_000.0
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_M / 180
+# Cell size bounds for the grid, in degrees
+MIN_CELL_DEG = 1e-4
+MAX_CELL_DEG = 1.0
+DEFAULT_CELL_DEG = 0.01
+# Sensors per occupied cell aimed for when the cell size is derived from the data
+TARGET_PER_CELL = 4
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (vectorized)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _cell_size(latitude, longitude):
+    """Cell size giving about TARGET_PER_CELL sensors per cell over the data's extent"""
+    if len(latitude) < 2:
+        return DEFAULT_CELL_DEG
+    area = max(np.ptp(latitude), MIN_CELL_DEG) * max(np.ptp(longitude), MIN_CELL_DEG)
+    return float(np.clip(np.sqrt(area * TARGET_PER_CELL / len(latitude)), MIN_CELL_DEG, MAX_CELL_DEG))
+
+
+class SensorIndex:
+    """Sorted-cell grid index answering bounding box, radius and nearest-sensor queries"""
+
+    def __init__(self, cell_deg=DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.n_cols = int(np.ceil(360 / cell_deg)) + 1
+        self.n_rows = int(np.ceil(180 / cell_deg)) + 1
+        self.sensor_ids = []
+        self._positions = {}
+        self.latitude = np.empty(0)
+        self.longitude = np.empty(0)
+        # Cell keys in ascending order and the sensor position in each slot
+        self._sorted = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_locations(cls, sensor_locations, cell_deg=None):
+        """Index a frame with sensor_id, latitude and longitude columns"""
+        latitude = sensor_locations['latitude'].to_numpy(dtype=np.float64)
+        longitude = sensor_locations['longitude'].to_numpy(dtype=np.float64)
+        located = ~(np.isnan(latitude) | np.isnan(longitude))
+        index = cls(cell_deg or _cell_size(latitude[located], longitude[located]))
+        index.add(sensor_locations['sensor_id'].astype(str).to_numpy()[located], latitude[located], longitude[located])
+        return index
+
+    def __len__(self):
+        return len(self._sorted[0])
+
+    def _rows_cols(self, latitude, longitude):
+        row = np.clip(np.floor((np.asarray(latitude) + 90) / self.cell_deg), 0, self.n_rows - 1).astype(np.int64)
+        col = np.clip(np.floor((np.asarray(longitude) + 180) / self.cell_deg), 0, self.n_cols - 1).astype(np.int64)
+        return row, col
+
+    def _keys(self, latitude, longitude):
+        row, col = self._rows_cols(latitude, longitude)
+        return row * self.n_cols + col
+
+    def add(self, sensor_ids, latitude, longitude):
+        """Insert sensors, moving any that are already indexed to their new location"""
+        sensor_ids = [str(s) for s in sensor_ids]
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        if len(sensor_ids) == 0:
+            return self
+        keys, order = self._sorted
+
+        # Later duplicates in the batch win, like later calls do
+        last = {sensor_id: i for i, sensor_id in enumerate(sensor_ids)}
+        batch = np.fromiter(last.values(), dtype=np.int64, count=len(last))
+        moved = np.array([self._positions.get(sensor_ids[i], -1) for i in batch], dtype=np.int64)
+
+        if (moved >= 0).any():
+            keep = ~np.isin(order, moved[moved >= 0])
+            keys, order = keys[keep], order[keep]
+
+        new = moved < 0
+        new_positions = len(self.sensor_ids) + np.arange(new.sum())
+        positions = moved.copy()
+        positions[new] = new_positions
+
+        latitude_all = np.concatenate([self.latitude, np.full(len(new_positions), np.nan)])
+        longitude_all = np.concatenate([self.longitude, np.full(len(new_positions), np.nan)])
+        latitude_all[positions] = latitude[batch]
+        longitude_all[positions] = longitude[batch]
+
+        # Merge the new keys into the sorted arrays (linear, no full re-sort)
+        new_keys = self._keys(latitude[batch], longitude[batch])
+        batch_order = np.argsort(new_keys, kind='stable')
+        new_keys, positions = new_keys[batch_order], positions[batch_order]
+        slots = np.searchsorted(keys, new_keys, side='right')
+
+        for position, i in zip(new_positions, batch[new]):
+            self._positions[sensor_ids[i]] = int(position)
+            self.sensor_ids.append(sensor_ids[i])
+        self.latitude, self.longitude = latitude_all, longitude_all
+        # Published last so concurrent readers never see slots for unknown positions
+        self._sorted = (np.insert(keys, slots, new_keys), np.insert(order, slots, positions))
+        return self
+
+    def location(self, sensor_id):
+        """(latitude, longitude) of an indexed sensor"""
+        position = self._positions[str(sensor_id)]
+        return float(self.latitude[position]), float(self.longitude[position])
+
+    def bbox(self, south, west, north, east):
+        """Positions (in sensor_ids order) of the sensors inside a bounding box"""
+        keys, order = self._sorted
+        if len(keys) == 0 or south > north or west > east:
+            return np.empty(0, dtype=np.int64)
+
+        (row0, row1), (col0, col1) = self._rows_cols([south, north], [west, east])
+        if row1 - row0 + 1 >= len(keys):
+            candidates = order
+        else:
+            # One contiguous key range per grid row of the box
+            rows = np.arange(row0, row1 + 1, dtype=np.int64) * self.n_cols
+            lo = np.searchsorted(keys, rows + col0, side='left')
+            hi = np.searchsorted(keys, rows + col1, side='right')
+            lengths = hi - lo
+            if lengths.sum() == 0:
+                return np.empty(0, dtype=np.int64)
+            starts = np.repeat(lo - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+            candidates = order[starts + np.arange(lengths.sum())]
+
+        latitude, longitude = self.latitude[candidates], self.longitude[candidates]
+        inside = (latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)
+        return np.sort(candidates[inside])
+
+    def _within(self, latitude, longitude, meters):
+        """Positions and distances of the sensors within ``meters`` of a point"""
+        dlat = meters / METERS_PER_DEGREE
+        cos_lat = np.cos(np.radians(min(abs(latitude) + dlat, 90.0)))
+        dlon = 180.0 if cos_lat < 1e-9 else min(meters / (METERS_PER_DEGREE * cos_lat), 180.0)
+
+        positions = self.bbox(latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon)
+        distance = haversine_m(latitude, longitude, self.latitude[positions], self.longitude[positions])
+        within = distance <= meters
+        return positions[within], distance[within]
+
+    def _frame(self, positions, distance):
+        order = np.argsort(distance, kind='stable')
+        positions, distance = positions[order], distance[order]
+        return pd.DataFrame({
+            'sensor_id': [self.sensor_ids[i] for i in positions],
+            'latitude': self.latitude[positions],
+            'longitude': self.longitude[positions],
+            'distance_m': distance
+        })
+
+    def radius(self, latitude, longitude, meters):
+        """Sensors within ``meters`` of a point, nearest first"""
+        return self._frame(*self._within(latitude, longitude, meters))
+
+    def nearest(self, latitude, longitude, k=1):
+        """The ``k`` sensors nearest to a point"""
+        k = min(k, len(self))
+        meters = self.cell_deg * METERS_PER_DEGREE
+        while True:
+            positions, distance = self._within(latitude, longitude, meters)
+            # Every sensor within the search radius is found, so k of them settle the answer
+            if len(positions) >= k or meters > np.pi * EARTH_RADIUS_M:
+                return self._frame(positions, distance).head(k)
+            meters *= 4
+
+    def around(self, sensor_id, meters):
+        """Other sensors within ``meters`` of an indexed sensor, nearest first"""
+        latitude, longitude = self.location(sensor_id)
+        found = self.radius(latitude, longitude, meters)
+        return found[found['sensor_id'] != str(sensor_id)].reset_index(drop=True)
+
+
+def benchmark(n_sensors=100_000, n_queries=1_000):
+    """Build, incremental add and query times for a synthetic network"""
+    rng = np.random.default_rng(0)
+    sensor_locations = pd.DataFrame({
+        'sensor_id': [f'S{i:06d}' for i in range(n_sensors)],
+        'latitude': 30.7 + rng.random(n_sensors) * 0.5,
+        'longitude': 78.4 + rng.random(n_sensors) * 0.5,
+    })
+
+    start = time.perf_counter()
+    index = SensorIndex.from_locations(sensor_locations)
+    print(f"🏗️ build {n_sensors:>10,} sensors     {time.perf_counter() - start:8.3f}s")
+
+    start = time.perf_counter()
+    index.add([f'N{i:03d}' for i in range(100)], 30.7 + rng.random(100) * 0.5, 78.4 + rng.random(100) * 0.5)
+    print(f"➕ add 100 sensors                {time.perf_counter() - start:8.3f}s")
+
+    points = np.column_stack([30.7 + rng.random(n_queries) * 0.5, 78.4 + rng.random(n_queries) * 0.5])
+    for label, query in (
+        ('bbox 0.01°', lambda lat, lon: index.bbox(lat, lon, lat + 0.01, lon + 0.01)),
+        ('radius 500 m', lambda lat, lon: index.radius(lat, lon, 500)),
+        ('nearest 10', lambda lat, lon: index.nearest(lat, lon, k=10)),
+    ):
+        start = time.perf_counter()
+        for lat, lon in points:
+            query(lat, lon)
+        print(f"🔍 {label:<14} per query      {(time.perf_counter() - start) / n_queries * 1000:8.3f}ms")
+
+
+if __name__ == "__main__":
+    print("🏔️ GeoShield spatial index benchmark")
+    benchmark()
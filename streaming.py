@@ -0,0 +1,372 @@
+"""
+Streaming ingestion with incremental risk updates
+
+Readings arrive as micro-batches from a source (a tailed CSV file, a TCP
+socket, an MQTT broker or the in-process LocalBroker stand-in). Each batch is
+classified on its own, appended to a fixed-size ring buffer per sensor and
+folded into running per-sensor risk counts, so the live risk summary never
+rescans history.
+"""
+import io
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from aggregates import RiskAggregates
+from correlation import CorrelationStats
+from features import RollingFeatures
+from ingest import MEASUREMENT_COLUMNS, SENSOR_DTYPES, compact_readings
+from pipeline import REQUIRED_COLUMNS
+from risk_engine import RISK_DTYPE, classify_risk
+from spatial_index import SensorIndex
+
+# Readings kept per sensor (one day of 1-minute data)
+RING_CAPACITY = 1440
+# Micro-batch limits for line/message based sources
+BATCH_INTERVAL = 1.0
+MAX_BATCH_ROWS = 10_000
+
+
+class SensorRingBuffer:
+    """Fixed-size ring buffer with the most recent readings of one sensor"""
+
+    def __init__(self, capacity=RING_CAPACITY, columns=MEASUREMENT_COLUMNS):
+        self.capacity = capacity
+        self.columns = list(columns)
+        self.timestamps = np.zeros(capacity, dtype='datetime64[ns]')
+        self.values = np.full((capacity, len(self.columns)), np.nan, dtype=np.float32)
+        self.risk = np.zeros(capacity, dtype=np.int8)
+        self.appended = 0
+
+    def __len__(self):
+        return min(self.appended, self.capacity)
+
+    def append(self, timestamps, values, risk):
+        """Append readings, overwriting the oldest once the buffer is full"""
+        if len(timestamps) > self.capacity:
+            skipped = len(timestamps) - self.capacity
+            timestamps, values, risk = timestamps[skipped:], values[skipped:], risk[skipped:]
+            self.appended += skipped
+
+        positions = (self.appended + np.arange(len(timestamps))) % self.capacity
+        self.timestamps[positions] = timestamps
+        self.values[positions] = values
+        self.risk[positions] = risk
+        self.appended += len(timestamps)
+
+    def to_frame(self):
+        """Buffered readings, oldest first"""
+        n = len(self)
+        order = (self.appended - n + np.arange(n)) % self.capacity
+        df = pd.DataFrame(self.values[order], columns=self.columns)
+        df.insert(0, 'timestamp', self.timestamps[order])
+        df['risk_level'] = pd.Categorical.from_codes(self.risk[order], dtype=RISK_DTYPE)
+        return df
+
+
+class LiveRiskState:
+    """Per-sensor ring buffers and running risk aggregates, updated per micro-batch"""
+
+    def __init__(self, rules=None, capacity=RING_CAPACITY):
+        self.rules = rules
+        self.capacity = capacity
+        self.buffers = {}
+        self.aggregates = RiskAggregates()
+        self.spatial_index = SensorIndex()
+        self.correlations = CorrelationStats()
+        self.features = RollingFeatures()
+        self.last_reading = None
+        self.total_readings = 0
+        self.last_update = None
+        self._lock = threading.Lock()
+
+    def update(self, batch):
+        """Fold one micro-batch of readings into the live state"""
+        missing = [col for col in REQUIRED_COLUMNS if col not in batch.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        if len(batch) == 0:
+            return
+
+        batch = self.features.update(batch.reset_index(drop=True))
+        timestamps = pd.to_datetime(batch['timestamp']).to_numpy(dtype='datetime64[ns]')
+        risk = np.asarray(classify_risk(batch, self.rules).codes)
+        values = np.column_stack([
+            batch[col].to_numpy(dtype=np.float32, na_value=np.nan) if col in batch.columns
+            else np.full(len(batch), np.nan, dtype=np.float32)
+            for col in MEASUREMENT_COLUMNS
+        ])
+
+        sensors, inverse = np.unique(batch['sensor_id'].astype(str).to_numpy(), return_inverse=True)
+
+        with self._lock:
+            # Running aggregates absorb the batch only; new sensors join the spatial index
+            known = len(self.aggregates)
+            self.aggregates.update(batch, risk)
+            self._index_new_sensors(known)
+            self.correlations.update(batch)
+
+            # Append each sensor's readings in arrival order
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.cumsum(np.bincount(inverse, minlength=len(sensors)))[:-1]
+            for sensor, positions in zip(sensors, np.split(order, bounds)):
+                if sensor not in self.buffers:
+                    self.buffers[sensor] = SensorRingBuffer(self.capacity)
+                self.buffers[sensor].append(timestamps[positions], values[positions], risk[positions])
+
+            batch_latest = pd.Timestamp(timestamps.max())
+            if self.last_reading is None or batch_latest > self.last_reading:
+                self.last_reading = batch_latest
+            self.total_readings += len(batch)
+            self.last_update = time.time()
+
+    def _index_new_sensors(self, known):
+        aggregates = self.aggregates
+        latitude, longitude = aggregates.latitude[known:], aggregates.longitude[known:]
+        located = ~(np.isnan(latitude) | np.isnan(longitude))
+        if located.any():
+            sensor_ids = np.array(aggregates.sensor_ids[known:], dtype=object)[located]
+            self.spatial_index.add(sensor_ids, latitude[located], longitude[located])
+
+    def snapshot(self):
+        """Risk analysis outputs (as from perform_risk_analysis) for the live data"""
+        with self._lock:
+            analysis = self.aggregates.to_analysis()
+            correlations = self.correlations.copy()
+            total_readings, last_update, last_reading = self.total_readings, self.last_update, self.last_reading
+
+        return {
+            **analysis,
+            'total_readings': total_readings,
+            'active_sensors': len(analysis['sensor_locations']),
+            'last_update': last_update,
+            'last_reading': last_reading,
+            'spatial_index': self.spatial_index,
+            'correlations': correlations
+        }
+
+    def recent_readings(self, sensor_id):
+        """Buffered readings of one sensor"""
+        with self._lock:
+            buffer = self.buffers.get(str(sensor_id))
+            return buffer.to_frame() if buffer is not None else None
+
+
+def _records_to_frame(records):
+    return compact_readings(pd.DataFrame.from_records(records))
+
+
+def _micro_batches(next_records, stop_event, batch_interval=BATCH_INTERVAL, max_rows=MAX_BATCH_ROWS):
+    """Group records from next_records(timeout) into DataFrames by time and size"""
+    while not stop_event.is_set():
+        records = []
+        deadline = time.monotonic() + batch_interval
+        while len(records) < max_rows and not stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            records.extend(next_records(remaining))
+        if records:
+            yield _records_to_frame(records)
+
+
+def _parse_payload(payload):
+    data = json.loads(payload)
+    return data if isinstance(data, list) else [data]
+
+
+def tail_csv(path, stop_event, poll_interval=BATCH_INTERVAL, from_start=False):
+    """Follow a growing CSV file, yielding newly appended rows
+
+    A file that has no complete header line yet is read from the start, and
+    its first line is taken as the header once it appears.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        header = f.readline()
+        if not header.endswith('\n'):
+            header = None
+            f.seek(0)
+        elif not from_start:
+            f.seek(0, os.SEEK_END)
+
+        partial = ''
+        while not stop_event.is_set():
+            chunk = f.read()
+            if not chunk:
+                stop_event.wait(poll_interval)
+                continue
+
+            lines = (partial + chunk).split('\n')
+            partial = lines.pop()  # Incomplete last line, finished by a later write
+            lines = [line for line in lines if line.strip()]
+            if header is None and lines:
+                header = lines.pop(0) + '\n'
+            if lines:
+                yield compact_readings(pd.read_csv(io.StringIO(header + '\n'.join(lines)), dtype=SENSOR_DTYPES))
+
+
+def socket_json_lines(host, port, stop_event, batch_interval=BATCH_INTERVAL):
+    """Read newline-delimited JSON readings from a TCP feed"""
+    with socket.create_connection((host, port), timeout=batch_interval) as conn:
+        buffer = b''
+
+        def next_records(timeout):
+            nonlocal buffer
+            conn.settimeout(max(timeout, 0.01))
+            try:
+                data = conn.recv(65536)
+            except socket.timeout:
+                return []
+            if not data:
+                stop_event.set()
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            return [record for line in lines if line.strip() for record in _parse_payload(line)]
+
+        yield from _micro_batches(next_records, stop_event, batch_interval)
+
+
+class LocalBroker:
+    """Minimal in-process stand-in for an MQTT broker (topic publish/subscribe)"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic):
+        subscription = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, topic, subscription):
+        with self._lock:
+            if subscription in self._subscribers.get(topic, []):
+                self._subscribers[topic].remove(subscription)
+
+    def publish(self, topic, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, []))
+        for subscription in subscribers:
+            subscription.put(payload)
+
+
+def _drain(subscription):
+    def next_records(timeout):
+        try:
+            records = _parse_payload(subscription.get(timeout=timeout))
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                records.extend(_parse_payload(subscription.get_nowait()))
+            except queue.Empty:
+                return records
+    return next_records
+
+
+def broker_messages(broker, topic, stop_event, batch_interval=BATCH_INTERVAL):
+    """Micro-batches of JSON readings published to a LocalBroker topic"""
+    subscription = broker.subscribe(topic)
+    try:
+        yield from _micro_batches(_drain(subscription), stop_event, batch_interval)
+    finally:
+        broker.unsubscribe(topic, subscription)
+
+
+def mqtt_messages(host, port, topic, stop_event, batch_interval=BATCH_INTERVAL):
+    """Micro-batches of JSON readings from an MQTT broker (requires paho-mqtt)"""
+    try:
+        import paho.mqtt.client as mqtt
+    except ImportError:
+        raise ImportError("MQTT streaming requires paho-mqtt (pip install paho-mqtt)")
+
+    subscription = queue.Queue()
+    client = mqtt.Client()
+    client.on_connect = lambda client, userdata, flags, rc, *args: client.subscribe(topic)
+    client.on_message = lambda client, userdata, message: subscription.put(message.payload)
+    client.connect(host, port)
+    client.loop_start()
+    try:
+        yield from _micro_batches(_drain(subscription), stop_event, batch_interval)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+
+def simulate_feed(broker, topic, network, stop_event, interval=1.0):
+    """Publish one reading per sensor every interval from a sample_data.SensorNetwork"""
+    readings = network.frame()
+    readings['sensor_id'] = readings['sensor_id'].astype(str)
+    step = 0
+    while not stop_event.is_set():
+        # Rows are sensor-major, so every n_times-th row is the same instant across sensors
+        batch = readings.iloc[step % network.n_times::network.n_times].copy()
+        batch['timestamp'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+        broker.publish(topic, batch.to_json(orient='records'))
+        step += 1
+        stop_event.wait(interval)
+
+
+class LiveMonitor:
+    """Runs a streaming source in a background thread, feeding a LiveRiskState
+
+    Each session owns its monitor (and the LocalBroker its simulated feed
+    publishes to), so starting or stopping a stream only affects that
+    session. The threads hold no reference to the monitor, and are stopped
+    when it is garbage collected with its session.
+    """
+
+    def __init__(self):
+        self.state = None
+        self.source_name = None
+        self.broker = LocalBroker()
+        self._status = {'error': None}
+        self._stop = None
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def error(self):
+        return self._status['error']
+
+    def start(self, source, name, rules=None, feeders=()):
+        """Start consuming ``source(stop_event)``; ``feeders`` run alongside it"""
+        self.stop()
+        state = self.state = LiveRiskState(rules)
+        status = self._status = {'error': None}
+        self.source_name = name
+        stop_event = threading.Event()
+        self._stop = weakref.finalize(self, stop_event.set)
+
+        def consume():
+            try:
+                for batch in source(stop_event):
+                    state.update(batch)
+                    if stop_event.is_set():
+                        break
+            except Exception as e:
+                status['error'] = str(e)
+                stop_event.set()
+
+        self._threads = [threading.Thread(target=feeder, args=(stop_event,), daemon=True) for feeder in feeders]
+        self._threads.append(threading.Thread(target=consume, daemon=True, name='geoshield-stream'))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
@@ -0,0 +1,19 @@
+"""
+Shared fixtures for the GeoShield test suite
+"""
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sample_data import SensorNetwork  # noqa: E402
+
+
+@pytest.fixture
+def readings():
+    """Two days of 30-minute readings from 12 sensors, with some high-risk sensors"""
+    return SensorNetwork(n_sensors=12, days=2, interval_minutes=30, high_risk_fraction=0.3,
+                         end='2024-06-30').frame()
@@ -0,0 +1,64 @@
+"""
+Per-sensor risk aggregates: modal risk level and incremental updates
+"""
+import numpy as np
+import pandas as pd
+
+from aggregates import RiskAggregates, mode_from_counts
+from risk_engine import RISK_DTYPE, RISK_LEVELS, classify_risk
+
+
+def _aggregates(sensors, levels):
+    df = pd.DataFrame({
+        'sensor_id': sensors,
+        'timestamp': pd.date_range('2024-01-01', periods=len(sensors), freq='h'),
+        'latitude': 1.0,
+        'longitude': 2.0,
+        'risk_level': pd.Categorical(levels, dtype=RISK_DTYPE),
+    })
+    return RiskAggregates.from_frame(df)
+
+
+def _modal(aggregates):
+    locations = aggregates.to_analysis()['sensor_locations']
+    return dict(zip(locations['sensor_id'], locations['risk_level']))
+
+
+def test_mode_from_counts_ties():
+    counts = np.array([[2, 1, 0], [1, 1, 0], [1, 0, 1], [0, 2, 2], [3, 3, 3]])
+    assert list(mode_from_counts(counts)) == [0, 1, 2, 2, 2]
+    assert list(mode_from_counts(counts, prefer_higher=False)) == [0, 0, 0, 1, 0]
+
+
+def test_most_common_level_per_sensor():
+    aggregates = _aggregates(['a', 'a', 'a', 'b', 'b'], ['Low', 'Low', 'High', 'Medium', 'Medium'])
+    assert _modal(aggregates) == {'a': 'Low', 'b': 'Medium'}
+
+
+def test_ties_go_to_the_more_severe_level():
+    # Alphabetically High < Low < Medium; by severity Low < Medium < High
+    aggregates = _aggregates(['a', 'a', 'b', 'b'], ['High', 'Low', 'Medium', 'Low'])
+    assert _modal(aggregates) == {'a': 'High', 'b': 'Medium'}
+    assert aggregates.to_analysis()['sensor_locations']['risk_level'].dtype == RISK_DTYPE
+
+
+def test_modal_risk_matches_value_counts(readings):
+    readings = readings.assign(risk_level=classify_risk(readings))
+    modal = _modal(RiskAggregates.from_frame(readings))
+    for sensor, levels in readings.groupby(readings['sensor_id'].astype(str))['risk_level']:
+        counts = levels.value_counts().reindex(RISK_LEVELS)
+        # Most frequent, the most severe of equally frequent levels
+        assert modal[sensor] == counts[counts == counts.max()].index[-1]
+
+
+def test_incremental_and_merged_match_full_build(readings):
+    readings = readings.assign(risk_level=classify_risk(readings))
+    full = RiskAggregates.from_frame(readings).to_analysis()
+
+    halves = [readings.iloc[: len(readings) // 2], readings.iloc[len(readings) // 2:]]
+    incremental = RiskAggregates.from_frame(halves[0]).update(halves[1]).to_analysis()
+    merged = RiskAggregates.combine([RiskAggregates.from_frame(half) for half in halves]).to_analysis()
+    for analysis in (incremental, merged):
+        pd.testing.assert_frame_equal(analysis['risk_summary'], full['risk_summary'])
+        pd.testing.assert_frame_equal(analysis['sensor_locations'], full['sensor_locations'])
+        assert analysis['total_high_risk'] == full['total_high_risk']
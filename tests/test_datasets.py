@@ -0,0 +1,59 @@
+"""
+Reference-counted dataset registry shared by sessions
+"""
+import gc
+
+import pytest
+
+from datasets import DatasetRegistry
+from pipeline import perform_risk_analysis, prepare_readings
+
+
+@pytest.fixture
+def processed(readings):
+    return perform_risk_analysis(prepare_readings(readings))
+
+
+def test_sessions_share_one_dataset(processed):
+    registry = DatasetRegistry()
+    first, second = registry.open(*processed), registry.open(*processed)
+    assert first.version == second.version
+    assert first.dataset is second.dataset
+    assert len(registry) == 1
+    assert registry.stats()[0]['sessions'] == 2
+
+
+def test_released_with_the_last_handle(processed):
+    registry = DatasetRegistry()
+    first, second = registry.open(*processed), registry.open(*processed)
+    first.release()
+    first.release()  # Idempotent: the second handle still holds the dataset
+    assert second.dataset is not None
+    second.release()
+    assert len(registry) == 0
+    assert second.dataset is None
+
+
+def test_released_when_handle_is_collected(processed):
+    registry = DatasetRegistry()
+    handle = registry.open(*processed)
+    del handle
+    gc.collect()
+    assert len(registry) == 0
+
+
+def test_different_data_gets_its_own_dataset(processed, readings):
+    registry = DatasetRegistry()
+    handles = [registry.open(*processed)]
+    other = readings[readings['sensor_id'].astype(str) != 'S001'].reset_index(drop=True)
+    handles.append(registry.open(*perform_risk_analysis(prepare_readings(other))))
+    assert len(registry) == 2
+    assert handles[0].version != handles[1].version
+
+
+def test_derived_indexes_are_built_once(processed):
+    registry = DatasetRegistry()
+    handle = registry.open(*processed)
+    dataset = handle.dataset
+    assert dataset.table is dataset.table
+    assert dataset.rollups is dataset.rollups
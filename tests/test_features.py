@@ -0,0 +1,79 @@
+"""
+Rolling features: vectorized windows and incremental appends
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FEATURE_COLUMNS, RollingFeatures, rolling_features
+
+
+def _naive(df, sensor, time):
+    """Features of one reading by scanning its sensor's readings"""
+    rows = df[df['sensor_id'].astype(str) == sensor].sort_values('timestamp', kind='stable')
+    now = rows[rows['timestamp'] == time].iloc[-1]
+    # Rates and changes start at the first reading at most 24h back; rainfall sums (t - w, t]
+    first = rows[rows['timestamp'] >= time - pd.Timedelta('24h')].iloc[0]
+    rainfall = lambda window: rows['rainfall_mm'][
+        (rows['timestamp'] > time - pd.Timedelta(window)) & (rows['timestamp'] <= time)
+    ].sum()
+    return {
+        'velocity_mm_day': (now['displacement_mm'] - first['displacement_mm'])
+        / ((time - first['timestamp']) / pd.Timedelta('1D')),
+        'rainfall_24h_mm': rainfall('24h'),
+        'rainfall_72h_mm': rainfall('72h'),
+        'pore_pressure_change_24h_kpa': now['pore_pressure_kpa'] - first['pore_pressure_kpa'],
+    }
+
+
+def test_windows_match_a_per_sensor_scan(readings):
+    features = rolling_features(readings)
+    rng = np.random.default_rng(3)
+    for position in rng.choice(len(readings), 20, replace=False):
+        row = readings.iloc[position]
+        expected = _naive(readings, str(row['sensor_id']), row['timestamp'])
+        for name, value in expected.items():
+            assert features[name].iloc[position] == pytest.approx(value, rel=1e-4, abs=1e-3, nan_ok=True), name
+
+
+def test_row_order_does_not_matter(readings):
+    shuffled = readings.sample(frac=1, random_state=0)
+    pd.testing.assert_frame_equal(rolling_features(shuffled).loc[readings.index], rolling_features(readings))
+
+
+@pytest.mark.parametrize('batch_hours', [1, 7, 30])
+def test_appended_batches_match_full_computation(readings, batch_hours):
+    full = rolling_features(readings)
+    batch_of = (readings['timestamp'] - readings['timestamp'].min()) // pd.Timedelta(hours=batch_hours)
+
+    state = RollingFeatures()
+    parts = [state.update(batch.sample(frac=1, random_state=1)) for _, batch in readings.groupby(batch_of)]
+    incremental = pd.concat(parts).loc[readings.index]
+    for name in FEATURE_COLUMNS:
+        np.testing.assert_allclose(incremental[name], full[name], rtol=1e-5, atol=1e-5, equal_nan=True)
+
+
+def test_history_is_bounded(readings):
+    state = RollingFeatures(history='6h')
+    state.update(readings)
+    timestamps = pd.Series(state.tail['timestamp'].view('datetime64[ns]'))
+    span = timestamps.groupby(state.tail['code']).agg(lambda t: t.max() - t.min())
+    assert (span <= pd.Timedelta('6h')).all()
+    assert state.update(readings.iloc[:0]).columns.tolist()[-len(FEATURE_COLUMNS):] == FEATURE_COLUMNS
+
+
+def test_missing_timestamp_stays_within_its_reading():
+    df = pd.DataFrame({
+        'sensor_id': ['A', 'A', 'B', 'B', 'A'],
+        'timestamp': pd.to_datetime(['2024-01-01 00:00', None, '2024-01-01 00:00', '2024-01-01 12:00',
+                                     '2024-01-01 06:00']),
+        'displacement_mm': [1.0, 2.0, 1.0, 19.0, 3.0],
+        'rainfall_mm': [5.0, 5.0, 5.0, 5.0, 5.0],
+    })
+    expected = rolling_features(df.drop(index=1))
+    for features in (rolling_features(df), RollingFeatures().update(df)):
+        assert features.loc[1, FEATURE_COLUMNS].isna().all()
+        pd.testing.assert_frame_equal(features.loc[expected.index, FEATURE_COLUMNS], expected)
+        # B's windows hold only its own readings
+        assert features.loc[3, 'rainfall_24h_mm'] == 10
+        assert features.loc[3, 'velocity_mm_day'] == 36
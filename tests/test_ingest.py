@@ -0,0 +1,54 @@
+"""
+Compact reading schema: dtypes, memory and unchanged results
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import COMPACT_DTYPES, TIMESTAMP_DTYPE, bytes_per_row, compact_readings, read_sensor_csv
+from risk_engine import classify_risk
+
+
+def test_known_columns_take_the_compact_dtypes(readings):
+    compact = compact_readings(readings.astype({'displacement_mm': 'float64', 'sensor_id': 'object'}))
+    for col in compact.columns:
+        if col in COMPACT_DTYPES:
+            assert compact[col].dtype == COMPACT_DTYPES[col], col
+    assert compact['timestamp'].dtype == TIMESTAMP_DTYPE
+    wide = readings.astype({'sensor_id': 'object', **{col: 'float64' for col in ('displacement_mm', 'latitude')}})
+    assert bytes_per_row(compact) < bytes_per_row(wide)
+
+
+def test_compact_frame_is_returned_as_is(readings):
+    compact = compact_readings(readings)
+    assert compact_readings(compact) is compact
+
+
+def test_csv_reader_produces_the_compact_schema(readings, tmp_path):
+    path = tmp_path / 'readings.csv'
+    readings.to_csv(path, index=False)
+    df = compact_readings(read_sensor_csv(path))
+    assert df['displacement_mm'].dtype == np.float32
+    assert isinstance(df['sensor_id'].dtype, pd.CategoricalDtype)
+    assert len(df) == len(readings)
+
+
+@pytest.mark.parametrize('threshold', [7.3, 10.1, 0.1, 33.33, 50])
+def test_classification_is_unchanged_by_compaction(threshold):
+    # Decimal readings at, just below and just above the threshold
+    values = np.round(threshold + np.arange(-5, 6) * 0.1, 1)
+    rules = {'levels': {
+        'High': {'column': 'displacement_mm', 'op': '>', 'value': threshold},
+        'Medium': {'any': [{'column': 'displacement_mm', 'op': '>=', 'value': threshold},
+                           {'column': 'rainfall_mm', 'op': '==', 'value': threshold}]},
+    }}
+    df = pd.DataFrame({'sensor_id': 'S001', 'displacement_mm': values, 'rainfall_mm': values[::-1]})
+    assert df['displacement_mm'].dtype == np.float64
+    assert list(classify_risk(compact_readings(df), rules)) == list(classify_risk(df, rules))
+
+
+def test_default_rules_unchanged_by_compaction(readings):
+    wide = readings.astype({col: 'float64' for col in ('displacement_mm', 'rainfall_mm')})
+    wide['displacement_mm'] = wide['displacement_mm'].round(1)
+    wide['rainfall_mm'] = wide['rainfall_mm'].round(1)
+    assert list(classify_risk(compact_readings(wide))) == list(classify_risk(wide))
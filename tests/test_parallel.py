@@ -0,0 +1,64 @@
+"""
+Partitioned (multi-process) classification against the in-process path
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import parallel
+from parallel import _classify_partitioned, _partitions, classify_and_aggregate, rule_columns
+
+
+def _assert_same(in_process, partitioned):
+    (risk_a, aggregates_a), (risk_b, aggregates_b) = in_process, partitioned
+    assert risk_a.dtype == risk_b.dtype
+    assert np.array_equal(np.asarray(risk_a.codes), np.asarray(risk_b.codes))
+    a, b = aggregates_a.to_analysis(), aggregates_b.to_analysis()
+    pd.testing.assert_frame_equal(a['risk_summary'], b['risk_summary'])
+    pd.testing.assert_frame_equal(a['sensor_locations'], b['sensor_locations'])
+    for key in ('total_high_risk', 'total_medium_risk', 'total_low_risk'):
+        assert a[key] == b[key]
+
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_pool_matches_in_process(readings, shuffle):
+    if shuffle:
+        readings = readings.sample(frac=1, random_state=0)
+    _assert_same(classify_and_aggregate(readings, workers=1), _classify_partitioned(readings, None, 2))
+
+
+def test_pool_matches_in_process_with_scoped_rules(readings):
+    rules = {
+        'levels': {'High': {'column': 'displacement_mm', 'op': '>', 'value': 8}},
+        'sensors': {'S002': {'levels': {'Medium': {'column': 'pore_pressure_kpa', 'op': '>', 'value': 0}}}},
+    }
+    _assert_same(classify_and_aggregate(readings, rules, workers=1), _classify_partitioned(readings, rules, 2))
+
+
+def test_pool_is_opt_in(readings, monkeypatch):
+    monkeypatch.setattr(parallel, 'PARALLEL_WORKERS', 1)
+    assert parallel.default_workers() == 1
+
+    def fail(*args):
+        raise AssertionError("pool used")
+    monkeypatch.setattr(parallel, '_classify_partitioned', fail)
+    classify_and_aggregate(readings, min_rows=0)
+
+
+def test_partitions_keep_sensors_whole():
+    codes = np.repeat(np.arange(7), [5, 1, 9, 2, 2, 8, 3])
+    bounds = _partitions(codes, 4)
+    assert bounds[0] == 0 and bounds[-1] == len(codes)
+    for bound in bounds[1:-1]:
+        assert codes[bound] != codes[bound - 1]
+
+
+def test_rule_columns():
+    rules = {
+        'levels': {'High': {'all': [
+            {'column': 'a', 'op': '>', 'value': 1},
+            {'not': {'column': 'b', 'op': '<', 'value': 0}},
+        ]}},
+        'sensors': {'S1': {'levels': {'Medium': {'column': 'c', 'op': '>', 'value': 1}}}},
+    }
+    assert sorted(rule_columns(rules)) == ['a', 'b', 'c']
@@ -0,0 +1,67 @@
+"""
+Out-of-core processing against loading the whole file
+"""
+import pandas as pd
+import pytest
+
+import pipeline
+from pipeline import analyze_out_of_core, iter_readings, perform_risk_analysis, prepare_readings, process_file
+
+FEATURE_RULES = {'levels': {
+    'High': {'column': 'velocity_mm_day', 'op': '>', 'value': 0.5},
+    'Medium': {'column': 'rainfall_72h_mm', 'op': '>', 'value': 40},
+}}
+
+
+@pytest.fixture
+def csv_path(readings, tmp_path):
+    path = tmp_path / 'site.csv'
+    # Time-major, as a logger appends readings
+    readings.sort_values('timestamp', kind='stable').to_csv(path, index=False)
+    return path
+
+
+def _sorted(df):
+    df = df.assign(sensor_id=df['sensor_id'].astype(str))
+    return df.sort_values(['sensor_id', 'timestamp'], kind='stable').reset_index(drop=True)
+
+
+@pytest.mark.parametrize('rules', [None, FEATURE_RULES])
+def test_chunked_analysis_matches_in_memory(csv_path, rules):
+    _, expected = perform_risk_analysis(prepare_readings(pd.read_csv(csv_path)), rules)
+    analysis = analyze_out_of_core(iter_readings(csv_path, 100), rules)
+
+    assert analysis['rows'] == len(pd.read_csv(csv_path))
+    pd.testing.assert_frame_equal(analysis['risk_summary'], expected['risk_summary'])
+    pd.testing.assert_frame_equal(analysis['sensor_locations'], expected['sensor_locations'])
+    for key in ('total_high_risk', 'total_medium_risk', 'total_low_risk'):
+        assert analysis[key] == expected[key]
+
+
+def test_exports_match_between_modes(csv_path, tmp_path, monkeypatch):
+    # Chunks of ~100 readings instead of the budget's minimum, so the file spans many
+    monkeypatch.setattr(pipeline, 'chunk_rows_for', lambda memory_mb: 100)
+    process_file(csv_path, tmp_path / 'memory', FEATURE_RULES)
+    process_file(csv_path, tmp_path / 'chunked', FEATURE_RULES, memory_mb=1)
+
+    for suffix in ('risk_summary.csv', 'sensor_locations.csv'):
+        memory = (tmp_path / 'memory' / f'site.{suffix}').read_text()
+        assert (tmp_path / 'chunked' / f'site.{suffix}').read_text() == memory
+
+    memory = pd.read_parquet(tmp_path / 'memory' / 'site.readings.parquet')
+    chunked = pd.read_parquet(tmp_path / 'chunked' / 'site.readings.parquet')
+    assert list(chunked.columns) == list(memory.columns)
+    pd.testing.assert_frame_equal(_sorted(chunked), _sorted(memory), check_categorical=False, rtol=1e-5)
+
+
+def test_readings_going_back_in_time_are_rejected(readings):
+    shuffled = readings.sample(frac=1, random_state=0)
+    chunks = [shuffled.iloc[i:i + 200] for i in range(0, len(shuffled), 200)]
+    with pytest.raises(ValueError, match='time order'):
+        analyze_out_of_core(iter(chunks))
+
+
+def test_unsorted_rows_within_a_chunk_are_accepted(readings):
+    _, expected = perform_risk_analysis(prepare_readings(readings.copy()), FEATURE_RULES)
+    analysis = analyze_out_of_core([readings.sample(frac=1, random_state=0)], FEATURE_RULES)
+    pd.testing.assert_frame_equal(analysis['risk_summary'], expected['risk_summary'])
@@ -0,0 +1,91 @@
+"""
+Vectorized risk classification and compiled rule sets
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_engine import (
+    DEFAULT_RULES, RISK_DTYPE, _benchmark_frame, _classify_risk_rowwise, classify_risk, compile_rules, parse_rules
+)
+
+
+def test_matches_rowwise_reference():
+    df = _benchmark_frame(5_000)
+    expected = _classify_risk_rowwise(df)
+    assert list(classify_risk(df)) == list(expected)
+
+
+def test_thresholds_are_strict():
+    df = pd.DataFrame({
+        'displacement_mm': [10.0, 10.1, 7.0, 7.1, 0.0, 10.1],
+        'rainfall_mm': [51.0, 50.0, 30.0, 0.0, 30.1, 50.1],
+    })
+    assert list(classify_risk(df)) == list(_classify_risk_rowwise(df))
+    assert list(classify_risk(df)) == ['Medium', 'Medium', 'Low', 'Medium', 'Medium', 'High']
+
+
+def test_missing_values_never_match():
+    df = pd.DataFrame({'displacement_mm': [np.nan, 12.0, np.nan], 'rainfall_mm': [60.0, np.nan, np.nan]})
+    assert list(classify_risk(df)) == ['Medium', 'Medium', 'Low']
+
+
+def test_returns_ordered_categorical(readings):
+    risk_level = classify_risk(readings)
+    assert risk_level.dtype == RISK_DTYPE
+    assert len(risk_level) == len(readings)
+    assert list(risk_level) == list(_classify_risk_rowwise(readings))
+
+
+def test_compile_reuses_identical_rules():
+    rules = {'levels': {'High': {'column': 'displacement_mm', 'op': '>', 'value': 10}}}
+    assert compile_rules(rules) is compile_rules(json.loads(json.dumps(rules)))
+    assert compile_rules(compile_rules(rules)) is compile_rules(rules)
+
+
+def test_default_rules_match_reference(readings):
+    assert list(classify_risk(readings, DEFAULT_RULES)) == list(_classify_risk_rowwise(readings))
+
+
+def test_nested_conditions():
+    rules = {'levels': {
+        'High': {'all': [{'column': 'a', 'op': '>=', 'value': 5}, {'not': {'column': 'b', 'op': '==', 'value': 0}}]},
+        'Medium': {'any': [{'column': 'a', 'op': '>', 'value': 2}, {'column': 'b', 'op': '<', 'value': 0}]},
+    }}
+    df = pd.DataFrame({'a': [5, 5, 3, 0, 0], 'b': [1, 0, 0, -1, 0]})
+    assert list(classify_risk(df, rules)) == ['High', 'Medium', 'Medium', 'Medium', 'Low']
+
+
+def test_site_and_sensor_overrides():
+    rules = {
+        'levels': {'High': {'column': 'x', 'op': '>', 'value': 10}},
+        'sites': {'North': {'levels': {'High': {'column': 'x', 'op': '>', 'value': 5}}}},
+        'sensors': {'S2': {'levels': {'Medium': {'column': 'x', 'op': '>', 'value': 1}}}},
+    }
+    df = pd.DataFrame({
+        'sensor_id': ['S1', 'S1', 'S2', 'S2', 'S3'],
+        'site_id': ['South', 'North', 'North', 'North', None],
+        'x': [8, 8, 8, 12, 12],
+    })
+    # S2's override keeps the default High level and adds Medium; it wins over its site
+    assert list(classify_risk(df, rules)) == ['Low', 'High', 'Medium', 'High', 'High']
+
+
+def test_parse_rules_json_and_yaml():
+    text = '{"levels": {"Medium": {"column": "rainfall_mm", "op": ">", "value": 30}}}'
+    assert parse_rules(text) == json.loads(text)
+    yaml_text = 'levels:\n  Medium:\n    column: rainfall_mm\n    op: ">"\n    value: 30\n'
+    assert parse_rules(yaml_text, yaml_format=True) == json.loads(text)
+
+
+@pytest.mark.parametrize('rules', [
+    {'levels': {'Severe': {'column': 'x', 'op': '>', 'value': 1}}},
+    {'levels': {'High': {'column': 'x', 'op': '=>', 'value': 1}}},
+    {'levels': {'High': {'all': []}}},
+    {'levels': {'High': ['x', '>', 1]}},
+])
+def test_invalid_rules_are_rejected(rules):
+    with pytest.raises(ValueError):
+        parse_rules(json.dumps(rules))
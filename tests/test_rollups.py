@@ -0,0 +1,65 @@
+"""
+Time-window rollups: incremental updates against a full rebuild
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_engine import classify_risk
+from rollups import RESOLUTIONS, SensorRollups, summarize
+
+
+@pytest.fixture
+def classified(readings):
+    return readings.assign(risk_level=classify_risk(readings))
+
+
+def _assert_same(a, b):
+    pd.testing.assert_frame_equal(
+        a.assign(sensor_id=a['sensor_id'].astype(str)),
+        b.assign(sensor_id=b['sensor_id'].astype(str)),
+        check_exact=False, rtol=1e-5,  # float32 sums, summed in another order
+    )
+
+
+@pytest.mark.parametrize('n_chunks', [2, 5])
+def test_incremental_update_matches_full_build(classified, n_chunks):
+    # Cut mid-hour so partial buckets from separate chunks have to merge
+    cuts = pd.date_range(classified['timestamp'].min(), classified['timestamp'].max(), periods=n_chunks + 1)
+    cuts = cuts[1:-1] + pd.Timedelta(minutes=13)
+    chunk_of = np.searchsorted(cuts.to_numpy(), classified['timestamp'].to_numpy(), side='right')
+
+    rollups = SensorRollups.from_frame(classified[chunk_of == 0])
+    for i in range(1, n_chunks):
+        rollups.update(classified[chunk_of == i])
+
+    full = SensorRollups.from_frame(classified)
+    for resolution in RESOLUTIONS:
+        _assert_same(rollups.levels[resolution], full.levels[resolution])
+
+
+def test_rollups_preserve_counts_and_extremes(classified):
+    rollups = SensorRollups.from_frame(classified)
+    for resolution in RESOLUTIONS:
+        rows = rollups.levels[resolution]
+        assert rows['count'].sum() == len(classified)
+        stats = summarize(rows, 'displacement_mm')
+        assert stats['min'] == classified['displacement_mm'].min()
+        assert stats['max'] == classified['displacement_mm'].max()
+        assert stats['mean'] == pytest.approx(classified['displacement_mm'].mean())
+
+
+def test_risk_counts_match_readings(classified):
+    trend = SensorRollups.from_frame(classified).risk_trend('week')
+    counts = classified['risk_level'].value_counts()
+    for level in ('Low', 'Medium', 'High'):
+        assert trend[f'{level.lower()}_risk'].sum() == counts[level]
+
+
+def test_query_filters_sensors_and_time(classified):
+    rollups = SensorRollups.from_frame(classified)
+    start = classified['timestamp'].min() + pd.Timedelta(hours=6)
+    rows = rollups.query('hour', sensors=['S001'], start=start)
+    assert set(rows['sensor_id'].astype(str)) == {'S001'}
+    assert rows['timestamp'].min() >= start.floor('h')
+    assert rollups.readings(['S001']) == int((classified['sensor_id'].astype(str) == 'S001').sum())
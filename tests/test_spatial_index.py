@@ -0,0 +1,76 @@
+"""
+Grid spatial index queries against brute-force scans
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial_index import SensorIndex, haversine_m
+
+
+@pytest.fixture
+def sensors():
+    rng = np.random.default_rng(7)
+    n = 2_000
+    return pd.DataFrame({
+        'sensor_id': [f'S{i:04d}' for i in range(n)],
+        'latitude': 24.17 + rng.normal(0, 0.05, n),
+        'longitude': 82.66 + rng.normal(0, 0.05, n),
+    })
+
+
+def test_bbox_matches_brute_force(sensors):
+    index = SensorIndex.from_locations(sensors)
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        south, north = np.sort(24.17 + rng.normal(0, 0.06, 2))
+        west, east = np.sort(82.66 + rng.normal(0, 0.06, 2))
+        expected = np.flatnonzero(
+            sensors['latitude'].between(south, north) & sensors['longitude'].between(west, east)
+        )
+        assert list(index.bbox(south, west, north, east)) == list(expected)
+
+
+def test_radius_matches_brute_force(sensors):
+    index = SensorIndex.from_locations(sensors)
+    distance = haversine_m(24.17, 82.66, sensors['latitude'].to_numpy(), sensors['longitude'].to_numpy())
+    for meters in (50, 500, 3_000):
+        found = index.radius(24.17, 82.66, meters)
+        assert sorted(found['sensor_id']) == sorted(sensors['sensor_id'][distance <= meters])
+        assert found['distance_m'].is_monotonic_increasing
+
+
+def test_nearest_matches_brute_force(sensors):
+    index = SensorIndex.from_locations(sensors)
+    for latitude, longitude in [(24.17, 82.66), (24.5, 82.9), (23.0, 80.0)]:
+        distance = haversine_m(latitude, longitude, sensors['latitude'].to_numpy(), sensors['longitude'].to_numpy())
+        expected = sensors['sensor_id'].to_numpy()[np.argsort(distance, kind='stable')[:5]]
+        assert list(index.nearest(latitude, longitude, k=5)['sensor_id']) == list(expected)
+
+
+def test_incremental_add_and_move(sensors):
+    index = SensorIndex.from_locations(sensors.iloc[:1_000])
+    index.add(sensors['sensor_id'][1_000:], sensors['latitude'][1_000:], sensors['longitude'][1_000:])
+    assert len(index) == len(sensors)
+
+    index.add(['S0000'], [10.0], [10.0])
+    assert len(index) == len(sensors)
+    assert index.location('S0000') == (10.0, 10.0)
+    assert list(index.radius(10.0, 10.0, 1)['sensor_id']) == ['S0000']
+    assert 'S0000' not in set(index.radius(24.17, 82.66, 50_000)['sensor_id'])
+
+
+def test_around_excludes_the_sensor(sensors):
+    index = SensorIndex.from_locations(sensors)
+    found = index.around('S0001', 1_000)
+    assert 'S0001' not in set(found['sensor_id'])
+    latitude, longitude = index.location('S0001')
+    distance = haversine_m(latitude, longitude, sensors['latitude'].to_numpy(), sensors['longitude'].to_numpy())
+    assert len(found) == int((distance <= 1_000).sum()) - 1
+
+
+def test_unlocated_sensors_are_skipped():
+    frame = pd.DataFrame({'sensor_id': ['A', 'B'], 'latitude': [1.0, np.nan], 'longitude': [2.0, 3.0]})
+    index = SensorIndex.from_locations(frame)
+    assert len(index) == 1
+    assert index.sensor_ids == ['A']